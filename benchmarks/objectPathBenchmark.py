@@ -0,0 +1,73 @@
+"""
+Micro-benchmark comparing exec based ObjectIds lookups with
+precompiled path lookups.
+
+Run from the repository root:
+    python benchmarks/objectPathBenchmark.py [objectCount] [depth]
+"""
+
+import os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from libpandaworld.WorldDataUtils import compileObjectIds, parseObjectPath, resolveObjectPath
+
+def makeObjectStruct(objectCount, depth):
+    """
+    This builds a synthetic objectStruct with objectCount objects
+    nested depth levels below a single region.
+    """
+
+    objectIds = {'region': '["Objects"]["region"]'}
+    region = {'Type': 'Region', 'Objects': {}}
+    parent = region
+    parentPath = objectIds['region']
+    for level in range(depth - 1):
+        uid = 'area%d' % level
+        area = {'Type': 'Island', 'Objects': {}}
+        parent['Objects'][uid] = area
+        parentPath = '%s["Objects"]["%s"]' % (parentPath, uid)
+        objectIds[uid] = parentPath
+        parent = area
+
+    for i in range(objectCount):
+        uid = '%d.%dbench' % (1150000000 + i, i)
+        parent['Objects'][uid] = {'Type': 'Prop', 'Visual': {'Model': 'models/props/barrel'}}
+        objectIds[uid] = '%s["Objects"]["%s"]' % (parentPath, uid)
+
+    return {'Objects': {'region': region}, 'ObjectIds': objectIds}
+
+def execLookup(fileData, uid):
+    namespace = {'fileData': fileData}
+    exec('objectInfo = fileData' + fileData['ObjectIds'][uid], namespace)
+    return namespace['objectInfo']
+
+def pathLookup(fileData, uid):
+    return resolveObjectPath(fileData, parseObjectPath(fileData['ObjectIds'][uid]))
+
+def main(objectCount=2000, depth=4, repeat=5):
+    fileData = makeObjectStruct(objectCount, depth)
+    uids = list(fileData['ObjectIds'].keys())
+    compileObjectIds(fileData['ObjectIds'])
+
+    for uid in uids:
+        assert execLookup(fileData, uid) is pathLookup(fileData, uid)
+
+    def runExec():
+        for uid in uids:
+            execLookup(fileData, uid)
+
+    def runPaths():
+        for uid in uids:
+            pathLookup(fileData, uid)
+
+    execTime = min(timeit.repeat(runExec, number=1, repeat=repeat))
+    pathTime = min(timeit.repeat(runPaths, number=1, repeat=repeat))
+    count = len(uids)
+    print('%d lookups, depth %d' % (count, depth))
+    print('exec:  %8.2f us/lookup' % (execTime / count * 1e6))
+    print('paths: %8.2f us/lookup' % (pathTime / count * 1e6))
+    print('speedup: %.1fx' % (execTime / pathTime))
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
\ No newline at end of file
@@ -0,0 +1,447 @@
+"""
+Benchmarks the WorldCreator and WorldCreatorAI load paths against
+generated world data, using stub repository, hub manager and config
+objects, so no running game or server is needed. Panda3D itself still
+has to be installed.
+
+Run from the repository root:
+    python benchmarks/worldCreatorBenchmark.py --output results.json
+    python benchmarks/worldCreatorBenchmark.py --compare results.json
+"""
+
+import os, sys, json, shutil, tempfile, timeit, argparse
+
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+BENCHMARK_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_PATH, '..', 'src'))
+sys.path.insert(0, BENCHMARK_PATH)
+
+from worldDataGenerator import WorldDataGenerator
+
+# Each section of the results is printed with its unit and scale.
+RESULT_SECTIONS = [('results', 's', 1.0), ('memory', 'MB', 1.0 / (1 << 20))]
+
+def getDeepSize(obj):
+    """
+    This returns the size in bytes of an object and everything it
+    holds on to, counting each object once. Modules, classes and
+    functions aren't followed.
+    """
+
+    seen = set()
+    stack = [obj]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, type(sys), type(getDeepSize))):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            if hasattr(obj, '__dict__'):
+                stack.append(obj.__dict__)
+            for name in getattr(type(obj), '__slots__', ()):
+                stack.append(getattr(obj, name, None))
+
+    return size
+
+class StubConfig(object):
+    """
+    This stands in for Panda3D's config, returning the
+    benchmark's values or the defaults.
+    """
+
+    def __init__(self, values):
+        self.values = values
+
+    def getValue(self, name, default):
+        return self.values.get(name, default)
+
+    GetString = GetBool = GetInt = GetFloat = getValue
+
+class StubRepository(object):
+
+    def yieldThread(self, name):
+        pass
+
+class StubObject(object):
+
+    def __init__(self, uid):
+        self.uid = uid
+
+    def getUniqueId(self):
+        return self.uid
+
+    def createObject(self, obj, objType, parent, parentUid, objKey, *args):
+        return StubObject(objKey)
+
+    def createObjects(self, batch):
+        return [StubObject(entry[4]) for entry in batch]
+
+class StubHubManager(object):
+
+    def __init__(self):
+        self.createdCount = 0
+
+    def createObject(self, *args):
+        self.createdCount += 1
+
+    def setLocationObject(self, obj):
+        self.createdCount += 1
+
+    def generateLocation(self, objKey):
+        self.createdCount += 1
+        return StubObject(objKey)
+
+class StubBatchHubManager(StubHubManager):
+
+    def createObjects(self, batch):
+        self.createdCount += len(batch)
+
+def installStubs(configValues):
+    if not hasattr(builtins, 'globalClock'):
+        from pandac.PandaModules import ClockObject
+        builtins.globalClock = ClockObject.getGlobalClock()
+    builtins.config = StubConfig(configValues)
+
+class WorldCreatorBenchmark(object):
+
+    def __init__(self, generator, repeat=5, configValues=None):
+        self.generator = generator
+        self.repeat = repeat
+        self.configValues = configValues or {}
+        self.outputPath = None
+        self.world = None
+
+    def setUp(self):
+        self.outputPath = tempfile.mkdtemp(prefix='libpandaworld-bench-')
+        sys.path.insert(0, self.outputPath)
+        self.world = self.generator.generate(self.outputPath)
+        values = {'world-data-dir': self.world['package']}
+        values.update(self.configValues)
+        installStubs(values)
+
+        # Import every module once, so the first timed run isn't
+        # the only one paying for compilation.
+        from libpandaworld.WorldCreatorAI import WorldCreatorAI
+        WorldCreatorAI(StubRepository(), self.world['regionFile'], StubHubManager()).makeRegion()
+
+    def tearDown(self):
+        sys.path.remove(self.outputPath)
+        shutil.rmtree(self.outputPath)
+
+    def makeClientCreator(self):
+        from libpandaworld.WorldCreator import WorldCreator
+        return WorldCreator(StubRepository(), self.world['regionFile'], StubHubManager(), StubObject('district'))
+
+    def makeAICreator(self):
+        from libpandaworld.WorldCreatorAI import WorldCreatorAI
+        return WorldCreatorAI(StubRepository(), self.world['regionFile'], StubHubManager())
+
+    def makeLoadedClientCreator(self):
+        creator = self.makeClientCreator()
+        creator.loadDataFile(self.world['regionFile'])
+        for areaUid in self.world['areaUids']:
+            creator.loadObjectsByUid(creator.district, areaUid)
+        return creator
+
+    def makeLoadedAICreator(self):
+        creator = self.makeAICreator()
+        creator.makeRegion()
+        return creator
+
+    def getModuleNames(self):
+        from libpandaworld.WorldDataCache import getWorldDataModules
+        return getWorldDataModules(self.world['package'])
+
+    def forgetModules(self):
+        """
+        This removes the world data modules from sys.modules, so
+        the next import runs them again.
+        """
+
+        prefix = self.world['package'] + '.'
+        for name in list(sys.modules):
+            if name.startswith(prefix):
+                del sys.modules[name]
+
+    def time(self, func, setup=None):
+        """
+        This returns the best time of func over the repeats. The setup
+        function's result is passed to func and isn't timed.
+        """
+
+        times = []
+        for i in range(self.repeat):
+            arg = setup() if setup else None
+            startTime = timeit.default_timer()
+            func(arg)
+            times.append(timeit.default_timer() - startTime)
+        return min(times)
+
+    def benchAIMakeRegion(self):
+        return self.time(lambda creator: creator.makeRegion(), self.makeAICreator)
+
+    def benchClientLoadDataFile(self):
+        return self.time(lambda creator: creator.loadDataFile(self.world['regionFile']), self.makeClientCreator)
+
+    def benchClientLoadObjectsByUid(self):
+        def setup():
+            creator = self.makeClientCreator()
+            creator.loadDataFile(self.world['regionFile'])
+            return creator
+
+        def run(creator):
+            for areaUid in self.world['areaUids']:
+                creator.loadObjectsByUid(creator.district, areaUid)
+
+        return self.time(run, setup)
+
+    def benchClientLoadObjectsByUidBatched(self):
+        def setup():
+            creator = self.makeClientCreator()
+            creator.setHubManager(StubBatchHubManager())
+            creator.loadDataFile(self.world['regionFile'])
+            return creator
+
+        def run(creator):
+            for areaUid in self.world['areaUids']:
+                creator.loadObjectsByUid(creator.district, areaUid)
+
+        return self.withConfig({'want-batched-object-creation': True}, lambda: self.time(run, setup))
+
+    def benchAIMakeRegionBatched(self):
+        return self.withConfig({'want-batched-object-creation': True}, lambda: self.time(lambda creator: creator.makeRegion(), self.makeAICreator))
+
+    def openFiles(self, creator):
+        """
+        This opens every world data module with openFile, releasing
+        any lazily loaded data straight away.
+        """
+
+        from libpandaworld.WorldDataStore import releaseLazyWorldData
+        for moduleName in self.getModuleNames():
+            releaseLazyWorldData(creator.openFile(moduleName))
+
+    def benchOpenFilesColdImport(self):
+        """
+        This opens every module by importing it after dropping it from
+        sys.modules. The modules are run from their bytecode, since
+        only the first run has to compile them.
+        """
+
+        def setup():
+            self.forgetModules()
+            return self.makeClientCreator()
+
+        return self.withConfig({'want-world-data-cache': False}, lambda: self.time(self.openFiles, setup))
+
+    def benchOpenFilesCache(self):
+        from libpandaworld.WorldDataCache import compileWorldDataDir
+        return self.withCompiledFiles(compileWorldDataDir(self.world['package']),
+            lambda: self.time(self.openFiles, self.makeClientCreator))
+
+    def benchOpenFilesLazy(self):
+        from libpandaworld.WorldDataStore import compileLazyWorldDataDir
+        return self.withCompiledFiles(compileLazyWorldDataDir(self.world['package']),
+            lambda: self.withConfig({'want-lazy-world-data': True}, lambda: self.time(self.openFiles, self.makeClientCreator)))
+
+    def benchOpenFilesSharedStore(self):
+        from libpandaworld.WorldDataSharedStore import compileSharedWorldData
+        storePath = os.path.join(self.outputPath, 'bench.wds')
+
+        def setup():
+            creator = self.makeClientCreator()
+            creator.attachSharedStore(storePath)
+            return creator
+
+        return self.withCompiledFiles([compileSharedWorldData(self.world['package'], storePath)],
+            lambda: self.time(self.openFiles, setup))
+
+    def withCompiledFiles(self, paths, func):
+        """
+        This calls func, then removes the compiled files written for it,
+        so they aren't read by the other benchmarks.
+        """
+
+        try:
+            return func()
+        finally:
+            for path in paths:
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+    def withConfig(self, values, func):
+        """
+        This calls func with extra config values set.
+        """
+
+        oldValues = dict(builtins.config.values)
+        builtins.config.values.update(values)
+        try:
+            return func()
+        finally:
+            builtins.config.values = oldValues
+
+    def benchUidLookups(self):
+        creator = self.makeLoadedClientCreator()
+
+        def run(arg):
+            for uid in self.world['objectUids']:
+                creator.getObjectDataByUid(uid)
+
+        return self.time(run)
+
+    def benchObjectLocationUid(self):
+        creator = self.makeLoadedClientCreator()
+
+        def run(arg):
+            for uid in self.world['objectUids']:
+                creator.getObjectLocationUid(uid)
+
+        return self.time(run)
+
+    def benchAIUidLookups(self):
+        creator = self.makeLoadedAICreator()
+
+        def run(arg):
+            for uid in self.world['objectUids']:
+                creator.getObjectDataByUid(uid)
+
+        return self.time(run)
+
+    def benchAIObjectLocationUid(self):
+        creator = self.makeLoadedAICreator()
+
+        def run(arg):
+            for uid in self.world['objectUids']:
+                creator.getObjectLocationUid(uid)
+
+        return self.time(run)
+
+    def measureOpenFiles(self, configValues):
+        """
+        This returns the size of the data of every module opened
+        from its cache file with extra config values set.
+        """
+
+        from libpandaworld.WorldDataCache import compileWorldDataDir
+
+        def measure():
+            creator = self.makeClientCreator()
+            return getDeepSize([creator.openFile(moduleName) for moduleName in self.getModuleNames()])
+
+        return self.withCompiledFiles(compileWorldDataDir(self.world['package']),
+            lambda: self.withConfig(configValues, measure))
+
+    def measureAIRegion(self, configValues):
+        """
+        This returns the size of the file data and indexes of a region
+        made by WorldCreatorAI from cache files with extra config values set.
+        """
+
+        from libpandaworld.WorldDataCache import compileWorldDataDir
+
+        def measure():
+            creator = self.makeLoadedAICreator()
+            return getDeepSize([creator.fileDicts, creator.uidIndex, creator.uidParents, creator.typeIndex])
+
+        return self.withCompiledFiles(compileWorldDataDir(self.world['package']),
+            lambda: self.withConfig(configValues, measure))
+
+    def memOpenFilesDicts(self):
+        return self.measureOpenFiles({})
+
+    def memOpenFilesColumnar(self):
+        return self.measureOpenFiles({'want-columnar-world-data': True})
+
+    def memAIRegionDicts(self):
+        return self.measureAIRegion({})
+
+    def memAIRegionColumnar(self):
+        return self.measureAIRegion({'want-columnar-world-data': True})
+
+    def run(self):
+        self.setUp()
+        try:
+            results = {}
+            memory = {}
+            for name in sorted(dir(self)):
+                if name.startswith('bench'):
+                    results[name[5:]] = getattr(self, name)()
+                elif name.startswith('mem'):
+                    memory[name[3:]] = getattr(self, name)()
+        finally:
+            self.tearDown()
+
+        return {'params': self.generator.getParams(), 'repeat': self.repeat, 'results': results, 'memory': memory}
+
+def compareResults(results, baseline, threshold):
+    """
+    This prints how each result compares to a baseline and returns the
+    names of the results that are slower or larger by more than the threshold.
+    """
+
+    regressions = []
+    if baseline.get('params') != results['params']:
+        print('Warning: baseline was run with different parameters: %s' % baseline.get('params'))
+
+    for section, unit, scale in RESULT_SECTIONS:
+        for name in sorted(results.get(section, {})):
+            newValue = results[section][name]
+            oldValue = baseline.get(section, {}).get(name)
+            if not oldValue:
+                print('%-24s %10.4f%s (new)' % (name, newValue * scale, unit))
+                continue
+            change = float(newValue - oldValue) / oldValue
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append(name)
+            print('%-24s %10.4f%s %+7.1f%%%s' % (name, newValue * scale, unit, change * 100, flag))
+
+    return regressions
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark the world creator load paths.')
+    parser.add_argument('--files', type=int, default=10, help='number of area files')
+    parser.add_argument('--depth', type=int, default=3, help='object nesting depth in each area')
+    parser.add_argument('--objects', type=int, default=200, help='objects per area file')
+    parser.add_argument('--fanout', type=int, default=1, help='AdditionalData files per area')
+    parser.add_argument('--repeat', type=int, default=5, help='times each benchmark is run')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the generated data')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='compare the results with this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown that counts as a regression')
+    args = parser.parse_args(args)
+
+    generator = WorldDataGenerator(args.files, args.depth, args.objects, args.fanout, args.seed)
+    results = WorldCreatorBenchmark(generator, args.repeat).run()
+
+    if args.output:
+        with open(args.output, 'w') as outputFile:
+            json.dump(results, outputFile, indent=4, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baselineFile:
+            baseline = json.load(baselineFile)
+        if compareResults(results, baseline, args.threshold):
+            return 1
+    else:
+        for section, unit, scale in RESULT_SECTIONS:
+            for name in sorted(results[section]):
+                print('%-24s %10.4f%s' % (name, results[section][name] * scale, unit))
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Generates synthetic world data packages for the benchmarks.
+
+A generated package has one region file, which references fileCount
+area files. Each area file holds objectsPerArea objects nested depth
+levels deep, and references additionalFanout AdditionalData files.
+"""
+
+import os, random
+
+MODULE_HEADER = 'from pandac.PandaModules import Point3, VBase3\n\n'
+
+class WorldDataGenerator(object):
+
+    def __init__(self, fileCount=10, depth=3, objectsPerArea=200, additionalFanout=1, seed=1):
+        self.fileCount = fileCount
+        self.depth = max(depth, 1)
+        self.objectsPerArea = objectsPerArea
+        self.additionalFanout = additionalFanout
+        self.random = random.Random(seed)
+        self.uidCount = 0
+
+    def getParams(self):
+        return {
+            'fileCount': self.fileCount,
+            'depth': self.depth,
+            'objectsPerArea': self.objectsPerArea,
+            'additionalFanout': self.additionalFanout}
+
+    def newUid(self):
+        self.uidCount += 1
+        return '%d.%dbench' % (1150000000 + self.uidCount, self.uidCount)
+
+    def newPos(self):
+        return 'Point3(%.2f, %.2f, %.2f)' % (self.random.uniform(-500, 500), self.random.uniform(-500, 500), 0)
+
+    def makeObject(self, objType, uid, path, objectIds, extra=None):
+        objectIds[uid] = path
+        obj = {'Type': objType, 'Pos': self.newPos(), 'Hpr': 'VBase3(0, 0, 0)'}
+        if extra:
+            obj.update(extra)
+        return obj
+
+    def makeArea(self, areaName, locationUid, additionalFiles):
+        """
+        This returns the objectStruct of an area file, with the
+        objects spread evenly across the nesting levels.
+        """
+
+        objectIds = {}
+        rootPath = '["Objects"]["%s"]' % locationUid
+        root = self.makeObject('Location', locationUid, rootPath, objectIds, {'Name': areaName, 'Objects': {}})
+        if additionalFiles:
+            root['AdditionalData'] = additionalFiles
+
+        parents = [(root, rootPath)]
+        for i in range(self.objectsPerArea):
+            level = i % self.depth
+            if level == 0 or len(parents) < 2:
+                parent, parentPath = parents[0]
+            else:
+                parent, parentPath = parents[self.random.randint(1, len(parents) - 1)]
+            uid = self.newUid()
+            path = '%s["Objects"]["%s"]' % (parentPath, uid)
+            if level < self.depth - 1:
+                obj = self.makeObject('Building', uid, path, objectIds, {'Objects': {}, 'Visual': {'Model': 'models/buildings/building%d' % (i % 20)}})
+                parents.append((obj, path))
+            else:
+                obj = self.makeObject('Spawn Node' if i % 5 == 0 else 'Prop', uid, path, objectIds, {'Visual': {'Model': 'models/props/prop%d' % (i % 50)}})
+            parent['Objects'][uid] = obj
+
+        return {'Objects': {locationUid: root}, 'ObjectIds': objectIds}
+
+    def formatValue(self, value, indent=0):
+        """
+        This formats a generated value as Python source. Strings holding
+        Point3 or VBase3 constructors are written out as calls.
+        """
+
+        pad = '    ' * (indent + 1)
+        if isinstance(value, dict):
+            if not value:
+                return '{}'
+            items = ['%s%r: %s,\n' % (pad, key, self.formatValue(value[key], indent + 1)) for key in sorted(value)]
+            return '{\n%s%s}' % (''.join(items), '    ' * indent)
+        if isinstance(value, str) and value.startswith(('Point3(', 'VBase3(')):
+            return value
+        return repr(value)
+
+    def writeModule(self, packagePath, moduleName, objectStruct):
+        with open(os.path.join(packagePath, moduleName + '.py'), 'w') as moduleFile:
+            moduleFile.write(MODULE_HEADER)
+            moduleFile.write('objectStruct = %s\n' % self.formatValue(objectStruct))
+
+    def generate(self, outputPath, packageName='benchWorldData'):
+        """
+        This writes the package and returns a dictionary describing it:
+        the region file name and the UIDs of the region, areas and objects.
+        """
+
+        packagePath = os.path.join(outputPath, packageName)
+        if not os.path.isdir(packagePath):
+            os.makedirs(packagePath)
+        open(os.path.join(packagePath, '__init__.py'), 'w').close()
+
+        regionUid = self.newUid()
+        regionPath = '["Objects"]["%s"]' % regionUid
+        regionIds = {regionUid: regionPath}
+        region = {'Type': 'Region', 'Name': 'benchRegion', 'Objects': {}}
+        areaUids = []
+        objectUids = []
+        for i in range(self.fileCount):
+            areaName = 'Area%d' % i
+            areaUid = self.newUid()
+            areaUids.append(areaUid)
+            additionalFiles = []
+            for j in range(self.additionalFanout):
+                additionalName = '%s_extra%d' % (areaName, j)
+                additionalFiles.append(additionalName)
+                additionalStruct = self.makeArea(additionalName, self.newUid(), [])
+                objectUids.extend(additionalStruct['ObjectIds'].keys())
+                self.writeModule(packagePath, additionalName, additionalStruct)
+
+            areaStruct = self.makeArea(areaName, areaUid, additionalFiles)
+            objectUids.extend(areaStruct['ObjectIds'].keys())
+            self.writeModule(packagePath, areaName, areaStruct)
+
+            region['Objects'][areaUid] = self.makeObject('Island', areaUid, '%s["Objects"]["%s"]' % (regionPath, areaUid), regionIds, {'File': areaName, 'Name': areaName})
+
+        self.writeModule(packagePath, 'Region', {'Objects': {regionUid: region}, 'ObjectIds': regionIds})
+        return {
+            'package': packageName,
+            'regionFile': 'Region.py',
+            'regionUid': regionUid,
+            'areaUids': areaUids,
+            'objectUids': sorted(objectUids)}
\ No newline at end of file
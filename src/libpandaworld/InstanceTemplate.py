@@ -0,0 +1,34 @@
+class InstanceTemplate(object):
+    """
+    This is the creation plan of an instanced object: the object and
+    everything below it, flattened depth first into a list of steps.
+    Each step is an (obj, objKey, parentStep, endStep) tuple, where
+    parentStep is the index of the step whose object is the parent
+    (-1 for the instanced object itself) and endStep is the index just
+    past the step's subtree, so a subtree can be skipped in one jump.
+    """
+
+    def __init__(self, obj, objKey):
+        self.obj = obj
+        self.objKey = objKey
+        self.steps = []
+        self.typeCounts = {}
+        self.addStep(obj, objKey, -1)
+
+    def addStep(self, obj, objKey, parentStep):
+        index = len(self.steps)
+        self.steps.append(None)
+        objType = obj.get('Type')
+        self.typeCounts[objType] = self.typeCounts.get(objType, 0) + 1
+
+        objDict = obj.get('Objects')
+        if objDict:
+            for childKey in objDict.keys():
+                child = objDict[childKey]
+                if hasattr(child, 'get'):
+                    self.addStep(child, childKey, index)
+
+        self.steps[index] = (obj, objKey, parentStep, len(self.steps))
+
+    def getObjectCount(self):
+        return len(self.steps)
\ No newline at end of file
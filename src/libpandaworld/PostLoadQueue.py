@@ -0,0 +1,134 @@
+import heapq
+
+class PostLoadQueue(object):
+    """
+    This is an ordered queue of functions to call after something in the
+    world is loaded. A function is only queued once until it is called,
+    lower priorities are called first, and functions with the same
+    priority are called in the order they were added.
+
+    A function is called at most once per pass, which lasts until the
+    queue is emptied. A function queued again after it was called in the
+    current pass is dropped, like the original list of calls did.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.queued = set()
+        self.unhashable = []
+        self.counter = 0
+        self.called = set()
+        self.calledUnhashable = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, funcCall):
+        try:
+            return funcCall in self.queued
+        except TypeError:
+            return funcCall in self.unhashable
+
+    def add(self, funcCall, priority=0):
+        """
+        This queues a function, unless it is already queued or was
+        already called in the current pass. Returns True if the
+        function was queued.
+        """
+
+        if funcCall in self or self.wasCalled(funcCall):
+            return False
+
+        try:
+            self.queued.add(funcCall)
+        except TypeError:
+            self.unhashable.append(funcCall)
+
+        heapq.heappush(self.heap, (priority, self.counter, funcCall))
+        self.counter += 1
+        return True
+
+    def pop(self):
+        """
+        This removes and returns the next function to call.
+        """
+
+        priority, counter, funcCall = heapq.heappop(self.heap)
+        try:
+            self.queued.discard(funcCall)
+        except TypeError:
+            self.unhashable.remove(funcCall)
+        return funcCall
+
+    def wasCalled(self, funcCall):
+        """
+        This checks if a function was already called in the current pass.
+        """
+
+        try:
+            return funcCall in self.called
+        except TypeError:
+            return funcCall in self.calledUnhashable
+
+    def setCalled(self, funcCall):
+        try:
+            self.called.add(funcCall)
+        except TypeError:
+            self.calledUnhashable.append(funcCall)
+
+    def endPass(self):
+        """
+        This ends the current pass, so every function can be queued again.
+        """
+
+        self.called = set()
+        self.calledUnhashable = []
+
+    def clear(self):
+        self.heap = []
+        self.queued = set()
+        self.unhashable = []
+        self.called = set()
+        self.calledUnhashable = []
+
+    def dispatch(self, budget=None, profiler=None):
+        """
+        This calls queued functions until the queue is empty, or until the
+        budget (in seconds) is used up. Functions queued while dispatching
+        are called as well, unless they were already called in this pass.
+        Each call is timed by the profiler, if one is passed. Returns True
+        once the queue is empty, which ends the pass.
+        """
+
+        startTime = globalClock.getRealTime()
+        while self.heap:
+            if budget is not None and globalClock.getRealTime() - startTime >= budget:
+                return False
+
+            funcCall = self.pop()
+            self.setCalled(funcCall)
+            if profiler:
+                callStartTime = globalClock.getRealTime()
+                funcCall()
+                profiler.recordCallback(getCallbackName(funcCall), globalClock.getRealTime() - callStartTime)
+            else:
+                funcCall()
+
+        self.endPass()
+        return True
+
+def getCallbackName(funcCall):
+    """
+    This returns a readable name for a callback, used in load profiles.
+    """
+
+    func = getattr(funcCall, 'func', funcCall)
+    name = getattr(func, '__qualname__', None)
+    if name is None:
+        name = getattr(func, '__name__', None)
+        owner = getattr(func, '__self__', None)
+        if name and owner is not None:
+            name = '%s.%s' % (owner.__class__.__name__, name)
+    if name is None:
+        name = func.__class__.__name__
+    return name
\ No newline at end of file
@@ -15,6 +15,7 @@ class WorldCreator(WorldCreatorBase):
         self.district = district
 
         self.hubAreas = {}
+        self.assetPrefetches = {}
 
         WorldCreatorBase.__init__(self, cr, worldFile, hubManager)
 
@@ -27,18 +28,27 @@ class WorldCreator(WorldCreatorBase):
         works about the same.
         """
 
+        self.retainFile(filename)
         if filename in self.fileDicts:
             return self.fileDicts
+        if self.profiler:
+            openStartTime = self.profiler.start('openFile')
         fileData = self.openFile(filename)
+        if self.profiler:
+            self.profiler.stop('openFile', openStartTime, fileName=filename)
         if parentUid:
             fileDict = {'filename': fileData}
             if merge:
-                parentUid = fileData['Objects'].keys()[0]
-            self.loadObjectsByUid(parent, parentUid, dynamic=dynamic, fileDict=fileDict, zoneLevel=zoneLevel, startTime=startTime)
+                parentUid = list(fileData['Objects'].keys())[0]
+            self.loadingFiles.append(filename)
+            try:
+                self.loadObjectsByUid(parent, parentUid, dynamic=dynamic, fileDict=fileDict, zoneLevel=zoneLevel, startTime=startTime)
+            finally:
+                self.loadingFiles.pop()
         else:
             if parent == self.district:
                 self.loadHubData(filename, fileData)
-        self.fileDicts[filename] = fileData
+        self.registerFileData(filename, fileData)
         return self.fileDicts
 
     def loadHubData(self, filename, fileData):
@@ -50,6 +60,42 @@ class WorldCreator(WorldCreatorBase):
         if hubAreas:
             self.hubAreas[filename] = hubAreas
 
+    def unregisterFileData(self, filename):
+        """
+        This overrides the WorldCreatorBase's unregisterFileData to
+        also drop the file's hub data and cancel the asset prefetches
+        of the areas it is part of.
+        """
+
+        self.hubAreas.pop(filename, None)
+        for uid in list(self.assetPrefetches):
+            if filename in self.assetPrefetches[uid][1]:
+                self.cancelAssetPrefetch(uid)
+        WorldCreatorBase.unregisterFileData(self, filename)
+
+    def clearFileData(self):
+        """
+        This overrides the WorldCreatorBase's clearFileData to
+        also drop the hub data and cancel every asset prefetch.
+        """
+
+        self.hubAreas = {}
+        for uid in list(self.assetPrefetches):
+            self.cancelAssetPrefetch(uid)
+        WorldCreatorBase.clearFileData(self)
+
+    def reloadFile(self, filename):
+        """
+        This overrides the WorldCreatorBase's reloadFile to also
+        reload the file's hub data.
+        """
+
+        hadHubData = filename in self.hubAreas
+        diff = WorldCreatorBase.reloadFile(self, filename)
+        if diff is not None and hadHubData:
+            self.loadHubData(filename, self.fileDicts[filename])
+        return diff
+
     def getHubData(self, filename):
         """
         Get the hub data.
@@ -60,11 +106,25 @@ class WorldCreator(WorldCreatorBase):
     def loadObjectsByUid(self, parent, parentUid, dynamic=0, fileDict=None, zoneLevel=0, startTime=None):
         """
         This will load world objects by the parent's UID.
+
+        If the config bool 'want-world-data-preload' is set, the files
+        of the area are opened up front (see preloadAreaFiles). If the
+        config bool 'want-world-asset-prefetch' is set, the files are
+        opened up front as well, so the models of the objects in them
+        can be prefetched first (see prefetchAssets).
         """
 
         if fileDict == None:
             fileDict = self.fileDicts
-        objectInfo = self.getObjectDataByUid(parentUid, fileDict)
+            wantPrefetch = config.GetBool('want-world-asset-prefetch', False)
+            if wantPrefetch or config.GetBool('want-world-data-preload', False):
+                self.preloadAreaFiles(parentUid)
+            if wantPrefetch:
+                self.prefetchAssets(parentUid)
+        declaringFile, objectInfo = self.getObjectEntryByUid(parentUid, fileDict)
+        if fileDict is not self.fileDicts:
+            # The object is in the file being loaded, which holds its references.
+            declaringFile = None
         if not objectInfo:
             self.notify.error('Data file not found for area being loaded: %s, make sure worldCreator.loadObjectsFromFile is being called.' % parentUid)
 
@@ -75,7 +135,7 @@ class WorldCreator(WorldCreatorBase):
                 additionalFiles = objectInfo['AdditionalData']
                 for currFile in additionalFiles:
                     if currFile + '.py' in self.fileDicts:
-                        altParentUid = self.fileDicts[currFile + '.py']['Objects'].keys()[0]
+                        altParentUid = list(self.fileDicts[currFile + '.py']['Objects'].keys())[0]
                         addObjDict = self.fileDicts[currFile + '.py']['Objects'][altParentUid]['Objects']
                         self.loadObjectDict(addObjDict, parent, parentUid, dynamic, zoneLevel=zoneLevel, startTime=startTime)
                         try:
@@ -84,16 +144,92 @@ class WorldCreator(WorldCreatorBase):
                             pass
 
         fileRef = objectInfo.get('File')
+        if not fileRef and declaringFile:
+            # Once the area's File is loaded, its root object is found rather than
+            # the object referencing the File, which the caller still references.
+            for name, entryInfo in self.getUidIndexEntries(parentUid):
+                if entryInfo.get('File'):
+                    fileRef = entryInfo['File']
+                    break
         if fileRef:
             self.loadObjectsFromFile(fileRef + '.py', parent, parentUid, dynamic, zoneLevel=zoneLevel, startTime=startTime)
 
         if 'AdditionalData' in objectInfo:
-            additionalFiles = objectInfo['AdditionalData']
-            for currFile in additionalFiles:
-                self.loadObjectsFromFile(currFile + '.py', parent, parentUid, dynamic, zoneLevel=zoneLevel, startTime=startTime, merge=True)
+            # AdditionalData files are referenced by the file declaring them.
+            if declaringFile:
+                self.loadingFiles.append(declaringFile)
+            try:
+                additionalFiles = objectInfo['AdditionalData']
+                for currFile in additionalFiles:
+                    self.loadObjectsFromFile(currFile + '.py', parent, parentUid, dynamic, zoneLevel=zoneLevel, startTime=startTime, merge=True)
+            finally:
+                if declaringFile:
+                    self.loadingFiles.pop()
 
         return
 
+    def preloadAreaFiles(self, uid):
+        """
+        This preloads the File and AdditionalData files of an area, along
+        with the AdditionalData files they merge in, which are the files
+        loadObjectsByUid opens for it (see preloadFiles).
+        """
+
+        filenames = self.getAreaFiles(uid)
+        if filenames:
+            self.preloadFiles(filenames, rootsOnly=True)
+
+    def getAreaFiles(self, uid):
+        """
+        This returns the File and AdditionalData files an area references.
+        """
+
+        filenames = []
+        for name, objectInfo in self.getUidIndexEntries(uid):
+            if objectInfo.get('File'):
+                filenames.append(objectInfo['File'])
+            filenames.extend(objectInfo.get('AdditionalData', []))
+
+        return filenames
+
+    def prefetchAssets(self, uid, callback=None):
+        """
+        This hands every model in a UID's asset manifest to the async
+        loader, so the models are read in the background while the hub
+        manager creates the objects. The callback is called with the
+        loaded models once they have all been read. The request is
+        returned, and is cancelled if a file of the area is unloaded
+        first (see cancelAssetPrefetch).
+        """
+
+        manifest = self.getAssetManifest(uid)
+        models = [name for name in manifest if name.endswith('.bam')]
+        if not models:
+            if callback:
+                callback([])
+            return
+
+        self.cancelAssetPrefetch(uid)
+
+        # Passing a callback makes the loader read the models asynchronously.
+        request = loader.loadModel(sorted(models), callback=self.assetsPrefetched, extraArgs=[uid, callback])
+        self.assetPrefetches[uid] = (request, manifest)
+        return request
+
+    def assetsPrefetched(self, uid, callback, models):
+        self.assetPrefetches.pop(uid, None)
+        if callback:
+            callback(models)
+
+    def cancelAssetPrefetch(self, uid):
+        """
+        This cancels the asset prefetch of a UID if it hasn't finished yet.
+        """
+
+        prefetch = self.assetPrefetches.pop(uid, None)
+        if prefetch:
+            loader.cancelRequest(prefetch[0])
+
     def createObject(self, obj, parent, parentUid, objKey, dynamic, zoneLevel=0, startTime=None, parentIsObj=False, fileName=None, actualParentObj=None):
         """
         This inherits the WorldCreatorBase's createObject and uses
@@ -109,18 +245,44 @@ class WorldCreator(WorldCreatorBase):
 
         # Should there be something more here?
 
+        if self.profiler:
+            hubStartTime = self.profiler.start('hubManager')
         self.getHubManager().createObject(obj, objType, parent, parentUid, objKey, dynamic, zoneLevel, startTime, parentIsObj, fileName, actualParentObj)
+        if self.profiler:
+            self.profiler.stop('hubManager', hubStartTime, fileName=fileName, objType=objType)
 
         return (newObj, newActualParent)
 
+    def getObjectBatchCreator(self, parent, actualParentObj):
+        """
+        This overrides WorldCreatorBase's getObjectBatchCreator, batching
+        objects when the hubManager has a createObjects method.
+        """
+
+        return getattr(self.getHubManager(), 'createObjects', None)
+
+    def getBatchedObjectInfo(self, obj, objType, newObj):
+        """
+        This overrides WorldCreatorBase's getBatchedObjectInfo, doing
+        the same thing as createObject.
+        """
+
+        return (None, None)
+
     def loadDataFile(self, fileName):
         """
         This will call loadObjectsFromFile with a specified fileName,
         using the District (parent of hub).
         """
 
-        self.fileDicts = {}
+        if self.profiler:
+            startTime = self.profiler.start('loadDataFile')
+        self.clearFileData()
+        self.preloadedFiles = {}
         self.loadObjectsFromFile(fileName, self.district)
+        if self.profiler:
+            self.profiler.stop('loadDataFile', startTime, fileName=fileName)
+            self.dumpLoadProfile()
 
     def loadObject(self, obj, parent, parentUid, objKey, dynamic, zoneLevel=0, startTime=None, parentIsObj=False, fileName=None, actualParentObj=None):
         """
@@ -139,4 +301,39 @@ class WorldCreator(WorldCreatorBase):
                 parentObj = newObj
                 newParentUid = objKey
                 self.loadObjectDict(objDict, parentObj, newParentUid, dynamic, zoneLevel=zoneLevel, startTime=startTime, actualParentObj=newObj)
-        return newObj
\ No newline at end of file
+        return newObj
+
+    def loadObjectIter(self, obj, parent, parentUid, objKey, dynamic, zoneLevel=0, startTime=None, parentIsObj=False, fileName=None, actualParentObj=None):
+        """
+        This overrides WorldCreatorBase's loadObjectIter, doing the
+        same thing as loadObject.
+        """
+
+        newObj, actualParentObj = self.createObject(obj, parent, parentUid, objKey, dynamic, zoneLevel=zoneLevel, startTime=startTime, fileName=fileName, actualParentObj=actualParentObj)
+        yield newObj
+        objDict = obj.get('Objects')
+        if objDict:
+            if newObj == None:
+                callback = lambda param0=0, param1=objDict, param2=objKey, param3=dynamic, param4=-1: self.loadObjectDictDelayed(param0, param1, param2, param3, param4)
+                if hasattr(self.repository, 'uidMgr'):
+                    self.repository.uidMgr.addUidCallback(objKey, callback)
+            else:
+                parentObj = newObj
+                newParentUid = objKey
+                for childObj in self.loadObjectDictIter(objDict, parentObj, newParentUid, dynamic, zoneLevel=zoneLevel, startTime=startTime, actualParentObj=newObj):
+                    yield childObj
+
+    def getChildLoadInfo(self, newObjInfo, obj, parent, objKey, dynamic):
+        """
+        This overrides WorldCreatorBase's getChildLoadInfo, doing the
+        same thing as loadObject.
+        """
+
+        newObj, actualParentObj = newObjInfo
+        if newObj == None:
+            objDict = obj.get('Objects')
+            callback = lambda param0=0, param1=objDict, param2=objKey, param3=dynamic, param4=-1: self.loadObjectDictDelayed(param0, param1, param2, param3, param4)
+            if hasattr(self.repository, 'uidMgr'):
+                self.repository.uidMgr.addUidCallback(objKey, callback)
+            return
+        return (newObj, objKey, newObj)
\ No newline at end of file
@@ -22,6 +22,9 @@ class WorldCreatorAI(WorldCreatorBase):
         newActualParent = None
         potentialObj = None
 
+        if self.profiler:
+            hubStartTime = self.profiler.start('hubManager')
+
         if objType == 'Region':
             self.getHubManager().setLocationObject(obj)
         elif objType == 'Location':
@@ -30,8 +33,40 @@ class WorldCreatorAI(WorldCreatorBase):
         elif actualParentObj:
             potentialObj = actualParentObj.createObject(obj, objType, parent, parentUid, objKey, dynamic, zoneLevel, startTime, parentIsObj, fileName, actualParentObj)
 
+        if self.profiler:
+            self.profiler.stop('hubManager', hubStartTime, fileName=fileName, objType=objType)
+
         if potentialObj:
             if 'Objects' in obj:
                 newObj = potentialObj
 
-        return (newObj, newActualParent)
\ No newline at end of file
+        return (newObj, newActualParent)
+
+    def getObjectBatchCreator(self, parent, actualParentObj):
+        """
+        This overrides WorldCreatorBase's getObjectBatchCreator, batching
+        objects when the actual parent object has a createObjects method.
+        """
+
+        if actualParentObj:
+            return getattr(actualParentObj, 'createObjects', None)
+
+    def canBatchObject(self, obj, dynamic):
+        """
+        This overrides WorldCreatorBase's canBatchObject, since Regions
+        and Locations are set up by the hubManager itself.
+        """
+
+        if obj.get('Type') in ('Region', 'Location'):
+            return False
+        return WorldCreatorBase.canBatchObject(self, obj, dynamic)
+
+    def getBatchedObjectInfo(self, obj, objType, newObj):
+        """
+        This overrides WorldCreatorBase's getBatchedObjectInfo, doing
+        the same thing as createObject.
+        """
+
+        if newObj and 'Objects' in obj:
+            return (newObj, None)
+        return (None, None)
\ No newline at end of file
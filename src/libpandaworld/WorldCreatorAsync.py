@@ -0,0 +1,292 @@
+from libpandaworld.WorldGlobals import WORLD_TYPE
+from libpandaworld.WorldDataUtils import getFileReferences, compileObjectIds
+import asyncio, re
+
+class WorldCreatorBaseAsync(object):
+    """
+    This is a mixin that adds asyncio versions of the WorldCreatorBase
+    loading methods, for tools and servers that run under an event loop.
+    It needs Python 3, and goes in front of the world creator it extends:
+
+        class AsyncWorldCreatorAI(WorldCreatorBaseAsync, WorldCreatorAI):
+            pass
+
+    Compiled world data files are read in an executor (modules without one
+    are imported on the event loop's thread), and objects are created in
+    batches of 'world-async-batch-size' objects, yielding to the event loop
+    between batches. Like the time sliced loaders, an object that references
+    a child File still loads that file in one step. makeRegionAsync opens
+    every referenced file before any objects are created,
+    unless 'want-lazy-world-data' is set, since lazy stores open cheaply.
+
+    A world creator only runs one async load at a time. To load several
+    districts concurrently, use a world creator for each of them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.asyncExecutor = None
+
+        super(WorldCreatorBaseAsync, self).__init__(*args, **kwargs)
+
+    def setAsyncExecutor(self, executor):
+        """
+        Set the executor world data files are opened in. By default,
+        the event loop's default executor is used.
+        """
+
+        self.asyncExecutor = executor
+
+    def getAsyncExecutor(self):
+        """
+        Get the executor world data files are opened in.
+        """
+
+        return self.asyncExecutor
+
+    async def makeRegionAsync(self):
+        """
+        This is an async version of makeRegion.
+        """
+
+        self.worldType = WORLD_TYPE
+        if self.worldFile:
+            if self.profiler:
+                startTime = self.profiler.start('makeRegion')
+            if not config.GetBool('want-lazy-world-data', False):
+                await self.preloadFilesAsync(self.worldFile)
+            await self.loadObjectsFromFileAsync(self.worldFile, self.repository)
+            self.preloadedFiles = {}
+            if self.profiler:
+                self.profiler.stop('makeRegion', startTime, fileName=self.worldFile)
+                self.dumpLoadProfile()
+        self.worldType = None
+
+    async def openFileAsync(self, filename):
+        """
+        This is an async version of openFile. Compiled files are read in
+        the async executor (see openCompiledFile). Preloaded files are
+        taken and modules are imported on the event loop's thread, so the
+        world creator's state is only changed from there.
+        """
+
+        if '.py' in filename:
+            moduleName = filename[:-3]
+        else:
+            moduleName = filename
+
+        objectStruct = self.preloadedFiles.pop(moduleName, None)
+        if objectStruct is not None:
+            compileObjectIds(objectStruct.get('ObjectIds', {}))
+            return objectStruct
+
+        loop = asyncio.get_running_loop()
+        objectStruct = await loop.run_in_executor(self.asyncExecutor, self.openCompiledFile, moduleName)
+        if objectStruct is not None:
+            return objectStruct
+
+        return self.importFile(moduleName)
+
+    async def preloadFilesAsync(self, filename, rootsOnly=False):
+        """
+        This is an async version of preloadFiles. Every file on a level
+        is opened concurrently in the async executor.
+        """
+
+        if isinstance(filename, (list, tuple)):
+            filenames = filename
+        else:
+            filenames = [filename]
+
+        seen = set(self.preloadedFiles)
+        seen.update([re.sub('.py$', '', name) for name in self.fileDicts])
+        level = []
+        for moduleName in filenames:
+            moduleName = re.sub('.py$', '', moduleName)
+            if moduleName not in seen:
+                seen.add(moduleName)
+                level.append(moduleName)
+
+        if not level:
+            return
+
+        if self.profiler:
+            startTime = self.profiler.start('preloadFiles')
+
+        while level:
+            nextLevel = []
+            fileDatas = await asyncio.gather(*[self.openFileAsync(moduleName) for moduleName in level])
+            for moduleName, fileData in zip(level, fileDatas):
+                if fileData is None:
+                    continue
+                self.preloadedFiles[moduleName] = fileData
+                for reference in getFileReferences(fileData, rootsOnly):
+                    if reference not in seen:
+                        seen.add(reference)
+                        nextLevel.append(reference)
+            level = nextLevel
+
+        if self.profiler:
+            self.profiler.stop('preloadFiles', startTime, fileName=', '.join(filenames))
+
+    async def loadObjectsFromFileAsync(self, filename, parent, zoneLevel=0, startTime=None, parentIsObj=False):
+        """
+        This is an async version of WorldCreatorBase's loadObjectsFromFile.
+        """
+
+        self.retainFile(filename)
+        if self.profiler:
+            openStartTime = self.profiler.start('openFile')
+        fileDict = await self.openFileAsync(filename)
+        if self.profiler:
+            self.profiler.stop('openFile', openStartTime, fileName=filename)
+        self.registerFileData(filename, fileDict)
+        objDict = fileDict.get('Objects')
+        parentUid = None
+        if hasattr(parent, 'getUniqueId'):
+            parentUid = parent.getUniqueId()
+        self.loadingFiles.append(filename)
+        try:
+            objects = await self.loadObjectDictAsync(objDict,
+                parent,
+                parentUid,
+                dynamic=0,
+                zoneLevel=zoneLevel,
+                startTime=startTime,
+                parentIsObj=parentIsObj,
+                fileName=re.sub('.py', '', filename))
+        finally:
+            self.loadingFiles.pop()
+        return [fileDict, objects]
+
+    async def loadObjectDictAsync(self, objDict, parent, parentUid, dynamic, zoneLevel=0, startTime=None, parentIsObj=False, fileName=None, actualParentObj=None, batchSize=None):
+        """
+        This is an async version of loadObjectDict. It yields to the event
+        loop after every batch of objects is created. The batch size can be
+        specified in the config int 'world-async-batch-size'.
+        """
+
+        if batchSize is None:
+            batchSize = config.GetInt('world-async-batch-size', 32)
+
+        objects = []
+        created = 0
+        loader = self.loadObjectDictIter(objDict,
+            parent,
+            parentUid,
+            dynamic,
+            zoneLevel=zoneLevel,
+            startTime=startTime,
+            parentIsObj=parentIsObj,
+            fileName=fileName,
+            actualParentObj=actualParentObj)
+        for newObj in loader:
+            if newObj:
+                objects.append(newObj)
+            created += 1
+            if created >= batchSize:
+                created = 0
+                await asyncio.sleep(0)
+
+        return objects
+
+class WorldCreatorAsync(WorldCreatorBaseAsync):
+    """
+    This is a mixin that adds asyncio versions of the WorldCreator
+    loading methods. It goes in front of a WorldCreator:
+
+        class AsyncWorldCreator(WorldCreatorAsync, WorldCreator):
+            pass
+    """
+
+    async def loadObjectsFromFileAsync(self, filename, parent, parentUid=None, dynamic=0, zoneLevel=0, startTime=None, merge=False):
+        """
+        This is an async version of WorldCreator's loadObjectsFromFile.
+        """
+
+        self.retainFile(filename)
+        if filename in self.fileDicts:
+            return self.fileDicts
+        if self.profiler:
+            openStartTime = self.profiler.start('openFile')
+        fileData = await self.openFileAsync(filename)
+        if self.profiler:
+            self.profiler.stop('openFile', openStartTime, fileName=filename)
+        if parentUid:
+            fileDict = {'filename': fileData}
+            if merge:
+                parentUid = list(fileData['Objects'].keys())[0]
+            self.loadingFiles.append(filename)
+            try:
+                await self.loadObjectsByUidAsync(parent, parentUid, dynamic=dynamic, fileDict=fileDict, zoneLevel=zoneLevel, startTime=startTime)
+            finally:
+                self.loadingFiles.pop()
+        else:
+            if parent == self.district:
+                self.loadHubData(filename, fileData)
+        self.registerFileData(filename, fileData)
+        return self.fileDicts
+
+    async def loadObjectsByUidAsync(self, parent, parentUid, dynamic=0, fileDict=None, zoneLevel=0, startTime=None):
+        """
+        This is an async version of loadObjectsByUid.
+        """
+
+        if fileDict == None:
+            fileDict = self.fileDicts
+            wantPrefetch = config.GetBool('want-world-asset-prefetch', False)
+            if wantPrefetch or config.GetBool('want-world-data-preload', False):
+                filenames = self.getAreaFiles(parentUid)
+                if filenames:
+                    await self.preloadFilesAsync(filenames, rootsOnly=True)
+            if wantPrefetch:
+                self.prefetchAssets(parentUid)
+        declaringFile, objectInfo = self.getObjectEntryByUid(parentUid, fileDict)
+        if fileDict is not self.fileDicts:
+            declaringFile = None
+        if not objectInfo:
+            self.notify.error('Data file not found for area being loaded: %s, make sure worldCreator.loadObjectsFromFile is being called.' % parentUid)
+
+        objDict = objectInfo.get('Objects')
+        if objDict != None:
+            await self.loadObjectDictAsync(objDict, parent, parentUid, dynamic, zoneLevel=zoneLevel, startTime=startTime)
+            if 'AdditionalData' in objectInfo:
+                additionalFiles = objectInfo['AdditionalData']
+                for currFile in additionalFiles:
+                    if currFile + '.py' in self.fileDicts:
+                        altParentUid = list(self.fileDicts[currFile + '.py']['Objects'].keys())[0]
+                        addObjDict = self.fileDicts[currFile + '.py']['Objects'][altParentUid]['Objects']
+                        await self.loadObjectDictAsync(addObjDict, parent, parentUid, dynamic, zoneLevel=zoneLevel, startTime=startTime)
+
+        fileRef = objectInfo.get('File')
+        if not fileRef and declaringFile:
+            for name, entryInfo in self.getUidIndexEntries(parentUid):
+                if entryInfo.get('File'):
+                    fileRef = entryInfo['File']
+                    break
+        if fileRef:
+            await self.loadObjectsFromFileAsync(fileRef + '.py', parent, parentUid, dynamic, zoneLevel=zoneLevel, startTime=startTime)
+
+        if 'AdditionalData' in objectInfo:
+            if declaringFile:
+                self.loadingFiles.append(declaringFile)
+            try:
+                additionalFiles = objectInfo['AdditionalData']
+                for currFile in additionalFiles:
+                    await self.loadObjectsFromFileAsync(currFile + '.py', parent, parentUid, dynamic, zoneLevel=zoneLevel, startTime=startTime, merge=True)
+            finally:
+                if declaringFile:
+                    self.loadingFiles.pop()
+
+    async def loadDataFileAsync(self, fileName):
+        """
+        This is an async version of loadDataFile. Only the data file itself
+        is opened, the files below it are opened by loadObjectsByUidAsync.
+        """
+
+        if self.profiler:
+            startTime = self.profiler.start('loadDataFile')
+        self.clearFileData()
+        await self.loadObjectsFromFileAsync(fileName, self.district)
+        if self.profiler:
+            self.profiler.stop('loadDataFile', startTime, fileName=fileName)
+            self.dumpLoadProfile()
\ No newline at end of file
@@ -1,8 +1,26 @@
 from pandac.PandaModules import *
 from direct.showbase.DirectObject import DirectObject
 from libpandaworld.WorldGlobals import WORLD_TYPE
+from libpandaworld.WorldDataUtils import compileObjectIds, forgetObjectIds, getFileReferences, getModelNames, getObjectTransform, parseObjectPath, resolveObjectPath, walkObjects
+from libpandaworld.WorldDataCache import getSourcePath, loadCachedWorldData, loadWorldData
+from libpandaworld.WorldObjectStream import WorldObjectStream
+from libpandaworld.WorldLoadProfiler import WorldLoadProfiler
+from libpandaworld.InstanceTemplate import InstanceTemplate
+from libpandaworld.PostLoadQueue import PostLoadQueue
+from libpandaworld.WorldDataDiff import diffWorldData
+from libpandaworld.WorldSpatialIndex import WorldSpatialIndex
+from libpandaworld.WorldObjectTable import getObjectTable, makeColumnarWorldData
+from libpandaworld.WorldDataStore import isLazyWorldData, loadLazyWorldData, releaseLazyWorldData, setRecordCacheSize
+from libpandaworld.WorldDataSharedStore import isSharedWorldData, openSharedWorldData
 from importlib import import_module
-import os, re, imp, types
+from multiprocessing.pool import Pool, ThreadPool
+from functools import partial
+import os, re, imp, sys
+
+try:
+    from importlib import reload
+except ImportError:
+    pass
 
 class WorldCreatorBase(DirectObject):
     """
@@ -18,20 +36,106 @@ class WorldCreatorBase(DirectObject):
         self.creatingInstance = False
         self.creatingInstanceParams = None
         self.fileDicts = {}
+        self.uidIndex = {}
+        self.indexedFiles = set()
+        self.lazyFiles = set()
+        self.uidParents = {}
+        self.sharedFiles = set()
+        self.fileOrder = {}
+        self.nextFileOrder = 0
+        self.assetManifests = {}
+        self.fileManifests = {}
+        self.objectLocations = {}
+        self.instanceTemplates = {}
+        self.fileHolders = {}
+        self.fileChildren = {}
+        self.loadingFiles = []
+        self.preloadedFiles = {}
         self.objectList = {}
-        self.postLoadCalls = []
+        self.objectCategories = {}
+        self.typeIndex = {}
+        self.spatialIndexes = {}
+        self.spatialFiles = {}
+        self.postLoadCalls = PostLoadQueue()
+        self.postLoadTask = None
+        self.timeSlicedLoads = set()
+        self.timeSlicedLoadCount = 0
+        self.objectStreams = {}
+        self.streamTypePriorities = {}
+
+        self.profiler = None
+        if config.GetBool('want-world-load-profile', False):
+            self.profiler = WorldLoadProfiler(config.GetBool('want-world-load-pstats', False))
+
+        self.sharedStore = None
+        sharedStorePath = config.GetString('world-data-shared-store', '')
+        if sharedStorePath:
+            self.attachSharedStore(sharedStorePath)
+
+    def attachSharedStore(self, storePath):
+        """
+        This attaches a shared world data store (see WorldDataSharedStore),
+        which openFile reads files from before anything else. Every world
+        creator in every process on a host maps the same store, rather than
+        holding its own copy of the world data. The store can also be
+        specified in the config string 'world-data-shared-store'.
+        """
+
+        self.sharedStore = openSharedWorldData(storePath)
+        if not self.sharedStore:
+            self.notify.warning('Could not attach the shared world data store %s' % storePath)
+        return self.sharedStore is not None
+
+    def getSharedUidFiles(self, uid):
+        """
+        This returns the names of the files defining a UID according to the
+        attached shared store, whether or not they have been loaded yet.
+        """
+
+        if not self.sharedStore:
+            return []
+
+        return [moduleName + '.py' for moduleName in self.sharedStore.getUidModules(uid)]
 
     def makeRegion(self):
         """
         This method takes the main region world file and loads
         all of the objects from the file.
+
+        If the config bool 'want-world-data-preload' is set, every world
+        data file the region references is opened up front (see preloadFiles).
         """
 
         self.worldType = WORLD_TYPE
         if self.worldFile:
+            if self.profiler:
+                startTime = self.profiler.start('makeRegion')
+            if config.GetBool('want-world-data-preload', False):
+                self.preloadFiles(self.worldFile)
             self.loadObjectsFromFile(self.worldFile, self.repository)
+            self.preloadedFiles = {}
+            if self.profiler:
+                self.profiler.stop('makeRegion', startTime, fileName=self.worldFile)
+                self.dumpLoadProfile()
         self.worldType = None
 
+    def dumpLoadProfile(self):
+        """
+        This writes the load profile as JSON to the file specified in
+        the config string 'world-load-profile-file', or to the log if
+        it isn't set, and then starts a new profile.
+        """
+
+        if not self.profiler:
+            return
+
+        filename = config.GetString('world-load-profile-file', '')
+        if filename:
+            self.profiler.writeReport(filename)
+        else:
+            self.notify.info('Load profile: %s' % self.profiler.getReportJson())
+        self.profiler.reset()
+
     def setHubManager(self, hubManager):
         """
         Set the hub manager.
@@ -52,27 +156,182 @@ class WorldCreatorBase(DirectObject):
         objects from the object dictionary.
         """
 
+        self.retainFile(filename)
+        if self.profiler:
+            openStartTime = self.profiler.start('openFile')
         fileDict = self.openFile(filename)
+        if self.profiler:
+            self.profiler.stop('openFile', openStartTime, fileName=filename)
+        self.registerFileData(filename, fileDict)
         objDict = fileDict.get('Objects')
         parentUid = None
         if hasattr(parent, 'getUniqueId'):
             parentUid = parent.getUniqueId()
-        objects = self.loadObjectDict(objDict,
-            parent,
-            parentUid,
-            dynamic=0,
-            zoneLevel=zoneLevel,
-            startTime=startTime,
-            parentIsObj=parentIsObj,
-            fileName=re.sub('.py', '', filename))
+        self.loadingFiles.append(filename)
+        try:
+            objects = self.loadObjectDict(objDict,
+                parent,
+                parentUid,
+                dynamic=0,
+                zoneLevel=zoneLevel,
+                startTime=startTime,
+                parentIsObj=parentIsObj,
+                fileName=re.sub('.py', '', filename))
+        finally:
+            self.loadingFiles.pop()
         return [fileDict, objects]
 
+    def retainFile(self, filename):
+        """
+        This adds a reference to a world data file. The reference is held
+        by the file currently being loaded, or by the caller (None) if no
+        file is being loaded, and is dropped with unloadFile. A file only
+        holds one reference to each file it references, however many
+        times it is loaded.
+        """
+
+        holder = None
+        if self.loadingFiles:
+            holder = self.loadingFiles[-1]
+            if filename in self.fileChildren.get(holder, []):
+                return
+
+        self.fileHolders.setdefault(filename, []).append(holder)
+        if holder is not None:
+            self.fileChildren.setdefault(holder, []).append(filename)
+
+    def unloadFile(self, filename, holder=None):
+        """
+        This drops a reference to a world data file. Once nothing references
+        the file, its data and indexes are released, along with the references
+        it holds to the files loaded through it, such as its File and
+        AdditionalData files. Returns True if the file was released.
+        """
+
+        holders = self.fileHolders.get(filename)
+        if not holders or holder not in holders:
+            self.notify.warning('unloadFile: %s is not referenced by %s' % (filename, holder))
+            return False
+
+        holders.remove(holder)
+        children = self.fileChildren.get(holder)
+        if children and filename in children:
+            children.remove(filename)
+        if holders:
+            return False
+
+        del self.fileHolders[filename]
+        self.unregisterFileData(filename)
+        for childFilename in list(self.fileChildren.pop(filename, [])):
+            self.unloadFile(childFilename, filename)
+
+        return True
+
+    def reloadFile(self, filename):
+        """
+        This re-opens a loaded world data file after it was edited, and
+        compares it against the loaded version. The hub manager is told
+        about every object that was removed, changed or added, through its
+        optional reloadObjectRemoved, reloadObjectChanged and
+        reloadObjectAdded methods, and only the file's own indexes are
+        rebuilt. The WorldDataDiff is returned.
+        """
+
+        oldData = self.fileDicts.get(filename)
+        if oldData is None:
+            self.notify.warning('reloadFile: %s is not loaded' % filename)
+            return
+
+        if self.profiler:
+            startTime = self.profiler.start('reloadFile')
+
+        newData = self.reopenFile(filename)
+        if newData is None:
+            self.notify.warning('reloadFile: could not open %s' % filename)
+            return
+
+        diff = diffWorldData(oldData, newData)
+        self.registerFileData(filename, newData)
+
+        hubManager = self.getHubManager()
+        removeObject = getattr(hubManager, 'reloadObjectRemoved', None)
+        changeObject = getattr(hubManager, 'reloadObjectChanged', None)
+        addObject = getattr(hubManager, 'reloadObjectAdded', None)
+        if removeObject:
+            for uid, obj, parentUid in diff.removed:
+                removeObject(uid, obj, parentUid, filename)
+        if changeObject:
+            for uid, oldObj, obj, parentUid in diff.changed:
+                changeObject(uid, oldObj, obj, parentUid, filename)
+        if addObject:
+            for uid, obj, parentUid in diff.added:
+                addObject(uid, obj, parentUid, filename)
+
+        if self.profiler:
+            self.profiler.stop('reloadFile', startTime, fileName=filename)
+
+        self.notify.info('Reloaded %s: %d added, %d removed, %d changed' % (filename, len(diff.added), len(diff.removed), len(diff.changed)))
+        return diff
+
+    def reopenFile(self, filename):
+        """
+        This opens a world data file like openFile, but reloads the
+        world data module if it was already imported, so edits to it
+        are picked up.
+        """
+
+        if '.py' in filename:
+            moduleName = filename[:-3]
+        else:
+            moduleName = filename
+
+        directory = config.GetString('world-data-dir', 'worldData')
+        module = sys.modules.get(directory + '.' + moduleName)
+        if module is None:
+            return self.openFile(filename)
+
+        try:
+            module = reload(module)
+        except Exception as e:
+            self.notify.warning('Got a %s when reloading %s' % (e, moduleName))
+            return
+
+        objectStruct = getattr(module, 'objectStruct', None)
+        if objectStruct is not None:
+            compileObjectIds(objectStruct.get('ObjectIds', {}))
+            return objectStruct
+
+    def getFileRefCount(self, filename):
+        """
+        This returns how many references there are to a world data file.
+        """
+
+        return len(self.fileHolders.get(filename, []))
+
     def loadObjectDict(self, objDict, parent, parentUid, dynamic, zoneLevel=0, startTime=None, parentIsObj=False, fileName=None, actualParentObj=None):
         """
         This method will take every key in an object dict and then
         load each object and return a list of the objects.
+
+        If the config bool 'want-batched-object-creation' is set and
+        there is a batch creator for this level (see getObjectBatchCreator),
+        the objects are created in batches (see loadObjectDictBatched).
         """
 
+        if config.GetBool('want-batched-object-creation', False):
+            createObjects = self.getObjectBatchCreator(parent, actualParentObj)
+            if createObjects:
+                return self.loadObjectDictBatched(createObjects,
+                    objDict,
+                    parent,
+                    parentUid,
+                    dynamic,
+                    zoneLevel=zoneLevel,
+                    startTime=startTime,
+                    parentIsObj=parentIsObj,
+                    fileName=fileName,
+                    actualParentObj=actualParentObj)
+
         objects = []
         for objKey in objDict.keys():
             newObj = self.loadObject(objDict[objKey],
@@ -90,12 +349,200 @@ class WorldCreatorBase(DirectObject):
 
         return objects
 
-    def loadInstancedObject(self, obj, parent, parentUid, objKey, instanceParams=[]):
+    def loadObjectDictBatched(self, createObjects, objDict, parent, parentUid, dynamic, zoneLevel=0, startTime=None, parentIsObj=False, fileName=None, actualParentObj=None):
+        """
+        This loads an object dict like loadObjectDict, but creates the
+        objects of each type with a single call to createObjects, instead
+        of one createObject call per object.
+
+        createObjects is passed a list of (obj, objType, parent, parentUid,
+        objKey, dynamic, zoneLevel, startTime, parentIsObj, fileName,
+        actualParentObj) entries, the same arguments createObject takes,
+        and may return a list of the objects it created in the same order.
+        Objects that can't be batched (see canBatchObject) are loaded one
+        at a time first. The children of every object are loaded once all
+        of the batches have been created.
+        """
+
+        objects = []
+        batches = {}
+        batchOrder = []
+        for objKey in objDict.keys():
+            obj = objDict[objKey]
+            if not self.canBatchObject(obj, dynamic):
+                newObj = self.loadObject(obj,
+                    parent,
+                    parentUid,
+                    objKey,
+                    dynamic,
+                    zoneLevel=zoneLevel,
+                    startTime=startTime,
+                    parentIsObj=parentIsObj,
+                    fileName=fileName,
+                    actualParentObj=actualParentObj)
+                if newObj:
+                    objects.append(newObj)
+                continue
+
+            objType = obj['Type']
+            batch = batches.get(objType)
+            if batch is None:
+                batch = batches[objType] = []
+                batchOrder.append(objType)
+            batch.append((obj, objType, parent, parentUid, objKey, dynamic, zoneLevel, startTime, parentIsObj, fileName, actualParentObj))
+
+        createdObjs = []
+        for objType in batchOrder:
+            batch = batches[objType]
+            if self.profiler:
+                hubStartTime = self.profiler.start('hubManager')
+            results = createObjects(batch) or [None] * len(batch)
+            if self.profiler:
+                self.profiler.stop('hubManager', hubStartTime, fileName=fileName, objType=objType)
+            createdObjs.extend(zip(batch, results))
+
+        for entry, potentialObj in createdObjs:
+            obj, objType, objKey = entry[0], entry[1], entry[4]
+            newObjInfo = self.getBatchedObjectInfo(obj, objType, potentialObj)
+            newObj = newObjInfo[0]
+            objDict = obj.get('Objects')
+            if objDict:
+                childInfo = self.getChildLoadInfo(newObjInfo, obj, parent, objKey, dynamic)
+                if childInfo:
+                    newObj, childParentUid, childActualParent = childInfo
+                    self.loadObjectDict(objDict,
+                        newObj,
+                        childParentUid,
+                        dynamic,
+                        zoneLevel=zoneLevel,
+                        startTime=startTime,
+                        fileName=fileName,
+                        actualParentObj=childActualParent)
+            if newObj:
+                objects.append(newObj)
+
+        return objects
+
+    def getObjectBatchCreator(self, parent, actualParentObj):
+        """
+        This returns the function that creates a batch of objects below
+        the passed parents, or None if they have to be created one at a
+        time. This is meant to be inherited.
+        """
+
+        return None
+
+    def canBatchObject(self, obj, dynamic):
+        """
+        This checks if an object can be created as part of a batch.
+        Objects that load a child File are always loaded on their own.
+        """
+
+        objType = obj.get('Type')
+        if not objType:
+            return False
+        if obj.get('File') and objType != 'Location Area':
+            return False
+        return True
+
+    def getBatchedObjectInfo(self, obj, objType, newObj):
+        """
+        This returns the (newObj, newActualParent) of an object created
+        as part of a batch, like createObject does.
+        """
+
+        return (newObj, None)
+
+    def loadObjectDictIter(self, objDict, parent, parentUid, dynamic, zoneLevel=0, startTime=None, parentIsObj=False, fileName=None, actualParentObj=None):
+        """
+        This is a generator version of loadObjectDict. It loads the
+        same objects, but yields after every object is created.
+        """
+
+        for objKey in objDict.keys():
+            for newObj in self.loadObjectIter(objDict[objKey],
+                parent,
+                parentUid,
+                objKey,
+                dynamic,
+                zoneLevel=zoneLevel,
+                startTime=startTime,
+                parentIsObj=parentIsObj,
+                fileName=fileName,
+                actualParentObj=actualParentObj):
+                yield newObj
+
+    def loadInstancedObject(self, obj, parent, parentUid, objKey, instanceParams=[], fileName=None):
+        """
+        This loads a new instance of an object and everything below it,
+        by replaying the object's instance template. The file defining
+        the object is looked up if fileName isn't given.
+        """
+
         self.creatingInstance = True
         self.creatingInstanceParams = instanceParams
-        newObj = self.loadObject(obj, parent, parentUid, objKey, False)
-        self.creatingInstance = False
-        self.creatingInstanceParams = None
+        try:
+            newObj = self.loadInstanceTemplate(self.getInstanceTemplate(obj, objKey, fileName), parent, parentUid)
+        finally:
+            self.creatingInstance = False
+            self.creatingInstanceParams = None
+        return newObj
+
+    def getInstanceTemplate(self, obj, objKey, fileName=None):
+        """
+        This returns the instance template of an object, compiling it the
+        first time. Templates are kept per (fileName, UID), rather than per
+        object data, since columnar and lazily loaded files build new object
+        data on every access. They are dropped when the file defining the
+        object is unregistered, which reloadFile does as well. Objects that
+        aren't defined in a loaded file get a new template every time.
+        """
+
+        if fileName is None:
+            fileName = self.getObjectEntryByUid(objKey)[0]
+            if fileName is None:
+                return InstanceTemplate(obj, objKey)
+
+        template = self.instanceTemplates.get((fileName, objKey))
+        if template is None:
+            template = InstanceTemplate(obj, objKey)
+            self.instanceTemplates[(fileName, objKey)] = template
+        return template
+
+    def loadInstanceTemplate(self, template, parent, parentUid):
+        """
+        This creates the objects of an instance template in order, doing
+        the same thing as loadObject without walking the object data.
+        """
+
+        steps = template.steps
+        childLoadInfo = [None] * len(steps)
+        newObj = None
+        index = 0
+        while index < len(steps):
+            obj, objKey, parentStep, endStep = steps[index]
+            if parentStep < 0:
+                stepParent, stepParentUid, actualParentObj = parent, parentUid, None
+            else:
+                stepParent, stepParentUid, actualParentObj = childLoadInfo[parentStep]
+
+            newObjInfo = self.createObject(obj, stepParent, stepParentUid, objKey, False, actualParentObj=actualParentObj)
+            childInfo = None
+            if endStep > index + 1:
+                childInfo = self.getChildLoadInfo(newObjInfo, obj, stepParent, objKey, False)
+            if index == 0:
+                if childInfo:
+                    newObj = childInfo[0]
+                elif newObjInfo:
+                    newObj = newObjInfo[0]
+
+            if childInfo:
+                childLoadInfo[index] = childInfo
+                index += 1
+            else:
+                # The children are either not loaded or loaded later.
+                index = endStep
+
         return newObj
 
     def loadObject(self, obj, parent, parentUid, objKey, dynamic, zoneLevel=0, startTime=None, parentIsObj=False, fileName=None, actualParentObj=None):
@@ -135,25 +582,220 @@ class WorldCreatorBase(DirectObject):
                 actualParentObj=newActualParent)
         return newObj
 
+    def loadObjectIter(self, obj, parent, parentUid, objKey, dynamic, zoneLevel=0, startTime=None, parentIsObj=False, fileName=None, actualParentObj=None):
+        """
+        This is a generator version of loadObject. It yields the new
+        object once it is created, then yields while loading its children.
+        Objects that reference a child File still load that file in one step.
+        """
+
+        newObjInfo = self.createObject(obj,
+            parent,
+            parentUid,
+            objKey,
+            dynamic,
+            zoneLevel=zoneLevel,
+            startTime=startTime,
+            parentIsObj=parentIsObj,
+            fileName=fileName,
+            actualParentObj=actualParentObj)
+        if newObjInfo:
+            newObj, newActualParent = newObjInfo
+        else:
+            yield None
+            return
+        yield newObj
+        objDict = obj.get('Objects')
+        if objDict:
+            if newObj == None:
+                newObj = parent
+                if hasattr(newObj, 'getUniqueId'):
+                    objKey = newObj.getUniqueId()
+            for childObj in self.loadObjectDictIter(objDict,
+                newObj,
+                objKey,
+                dynamic,
+                zoneLevel=zoneLevel,
+                startTime=startTime,
+                fileName=fileName,
+                actualParentObj=newActualParent):
+                yield childObj
+
+    def loadObjectDictTimeSliced(self, objDict, parent, parentUid, dynamic, zoneLevel=0, callback=None, frameBudget=None, fileName=None, actualParentObj=None):
+        """
+        This loads an object dict over as many frames as needed, from a task
+        that stops creating objects once the frame budget (in milliseconds)
+        is used up. The budget can be specified in the config float
+        'world-load-frame-budget'. Once everything is loaded, the callback is
+        called, followed by processPostLoadCalls. The task name is returned.
+        """
+
+        loader = self.loadObjectDictIter(objDict,
+            parent,
+            parentUid,
+            dynamic,
+            zoneLevel=zoneLevel,
+            startTime=globalClock.getRealTime(),
+            fileName=fileName,
+            actualParentObj=actualParentObj)
+        return self.startTimeSlicedLoad(loader, callback, frameBudget)
+
+    def startTimeSlicedLoad(self, loader, callback=None, frameBudget=None):
+        """
+        This starts a task that runs a loader generator until the frame
+        budget (in milliseconds) is used up each frame. The task name is returned.
+        """
+
+        if frameBudget is None:
+            frameBudget = config.GetFloat('world-load-frame-budget', 5.0)
+
+        self.timeSlicedLoadCount += 1
+        taskName = 'worldCreatorLoad-%s-%d' % (id(self), self.timeSlicedLoadCount)
+        self.timeSlicedLoads.add(taskName)
+        taskMgr.add(self.timeSlicedLoadTask, taskName, extraArgs=[loader, frameBudget / 1000.0, callback, taskName], appendTask=True)
+        return taskName
+
+    def timeSlicedLoadTask(self, loader, frameBudget, callback, taskName, task):
+        """
+        This creates objects until the frame budget is used up, then
+        waits for the next frame.
+        """
+
+        startTime = globalClock.getRealTime()
+        for newObj in loader:
+            if globalClock.getRealTime() - startTime >= frameBudget:
+                return task.cont
+
+        self.timeSlicedLoads.discard(taskName)
+        self.objectStreams.pop(taskName, None)
+        if callback:
+            callback()
+        self.processPostLoadCalls()
+        return task.done
+
+    def cancelTimeSlicedLoads(self):
+        """
+        This stops every time sliced load that hasn't finished yet.
+        """
+
+        for taskName in self.timeSlicedLoads:
+            taskMgr.remove(taskName)
+
+        self.timeSlicedLoads = set()
+        self.objectStreams = {}
+
+    def loadObjectDictStreamed(self, objDict, parent, parentUid, dynamic, focusPos=None, zoneLevel=0, callback=None, frameBudget=None, fileName=None, actualParentObj=None):
+        """
+        This loads an object dict over several frames like
+        loadObjectDictTimeSliced, but creates objects in priority order:
+        lowest zone level first, then by the priority of their type (see
+        setStreamTypePriority), then nearest to the focus position first.
+        The stream is returned, so its focus can be moved while it loads.
+        """
+
+        stream = WorldObjectStream(focusPos, self.streamTypePriorities)
+        stream.pushObjects(objDict, parent, parentUid, zoneLevel, fileName=fileName, actualParentObj=actualParentObj)
+        loader = self.loadObjectStreamIter(stream, dynamic, startTime=globalClock.getRealTime())
+        stream.taskName = self.startTimeSlicedLoad(loader, callback, frameBudget)
+        self.objectStreams[stream.taskName] = stream
+        return stream
+
+    def loadObjectStreamIter(self, stream, dynamic, startTime=None):
+        """
+        This creates the objects of a stream one at a time, queueing the
+        children of each object as it is created.
+        """
+
+        while stream:
+            obj, objKey, parent, parentUid, zoneLevel, pos, fileName, actualParentObj = stream.pop()
+            newObjInfo = self.createObject(obj,
+                parent,
+                parentUid,
+                objKey,
+                dynamic,
+                zoneLevel=zoneLevel,
+                startTime=startTime,
+                fileName=fileName,
+                actualParentObj=actualParentObj)
+            objDict = obj.get('Objects')
+            if objDict:
+                childInfo = self.getChildLoadInfo(newObjInfo, obj, parent, objKey, dynamic)
+                if childInfo:
+                    childParent, childParentUid, childActualParent = childInfo
+                    stream.pushObjects(objDict, childParent, childParentUid, zoneLevel, pos, fileName, childActualParent)
+            if newObjInfo:
+                yield newObjInfo[0]
+            else:
+                yield None
+
+    def getChildLoadInfo(self, newObjInfo, obj, parent, objKey, dynamic):
+        """
+        This returns the (parent, parentUid, actualParentObj) that the
+        children of a newly created object are loaded with, the same
+        way as loadObject, or None if they shouldn't be loaded now.
+        """
+
+        if not newObjInfo:
+            return
+
+        newObj, newActualParent = newObjInfo
+        if newObj == None:
+            newObj = parent
+            if hasattr(newObj, 'getUniqueId'):
+                objKey = newObj.getUniqueId()
+        return (newObj, objKey, newActualParent)
+
+    def setStreamFocus(self, focusPos):
+        """
+        This moves the focus position of every streamed load.
+        """
+
+        for stream in self.objectStreams.values():
+            stream.setFocus(focusPos)
+
+    def setStreamTypePriority(self, objectType, priority):
+        """
+        This sets the streaming priority of an object type. Types with
+        a lower priority are created first.
+        """
+
+        self.streamTypePriorities[objectType] = priority
+
     def appendObjectList(self, key, value):
         """
         Append a key/value to the object list.
+
+        The types of the category are added to the category index (see
+        findObjectCategory) straight away, so a category's dict must not
+        be changed after it is appended. Append it again instead.
         """
 
+        replaced = key in self.objectList
         self.objectList[key] = value
+        if replaced:
+            self.rebuildObjectCategories()
+            return
+
+        for objectType in value:
+            self.objectCategories.setdefault(objectType, key)
+
+    def rebuildObjectCategories(self):
+        """
+        This rebuilds the index of object types to the object list
+        category they are in. Call it after changing objectList directly.
+        """
+
+        self.objectCategories = {}
+        for currCat in self.objectList:
+            for objectType in self.objectList[currCat]:
+                self.objectCategories.setdefault(objectType, currCat)
 
     def findObjectCategory(self, objectType):
         """
         Find an object category in the object list.
         """
 
-        cats = self.objectList.keys()
-        for currCat in cats:
-            types = self.objectList[currCat].keys()
-            if objectType in types:
-                return currCat
-
-        return
+        return self.objectCategories.get(objectType)
 
     def createObject(self, obj, parent, parentUid, objKey, dynamic, zoneLevel=0, startTime=None, parentIsObj=False, fileName=None, actualParentObj=None):
         """
@@ -175,12 +817,115 @@ class WorldCreatorBase(DirectObject):
             return
         return objType
 
+    def preloadFiles(self, filename, workers=None, useProcesses=None, rootsOnly=False):
+        """
+        This opens a world data file, or a list of files, and every file it
+        references through File and AdditionalData entries, a level at a time,
+        in a worker pool. With rootsOnly, only the references of each file's
+        root objects are followed. Files that are already loaded or preloaded
+        are skipped. The opened files are handed out by openFile, so objects
+        can then be created on the main thread without waiting on I/O and parsing.
+
+        The pool size can be specified in the config int
+        'world-data-preload-workers'. By default, worker threads only read
+        compiled files (cache files, lazy stores and the shared store), and
+        files without one are imported on the calling thread. Imports hold
+        the import lock and the GIL, so they wouldn't run in parallel, and
+        would deadlock if the world is created while a module is imported.
+        Unpickling compiled files can import as well, so if the import lock
+        is held, files are opened one at a time on the calling thread instead.
+
+        With the config bool 'world-data-preload-processes', files are opened
+        in worker processes instead, which can import in parallel. Lazy stores
+        are not used by worker processes.
+        """
+
+        if isinstance(filename, (list, tuple)):
+            filenames = filename
+        else:
+            filenames = [filename]
+
+        seen = set(self.preloadedFiles)
+        seen.update([re.sub('.py$', '', name) for name in self.fileDicts])
+        level = []
+        for moduleName in filenames:
+            moduleName = re.sub('.py$', '', moduleName)
+            if moduleName not in seen:
+                seen.add(moduleName)
+                level.append(moduleName)
+
+        if not level:
+            return
+
+        if workers is None:
+            workers = config.GetInt('world-data-preload-workers', 4)
+        if useProcesses is None:
+            useProcesses = config.GetBool('world-data-preload-processes', False)
+
+        pool = None
+        if imp.lock_held():
+            # Worker threads would block on the import lock held by this thread.
+            self.notify.info('preloadFiles: the import lock is held, opening files on this thread')
+            useProcesses = False
+            openFunc = self.openCompiledFile
+            mapFunc = map
+        elif useProcesses:
+            directory = config.GetString('world-data-dir', 'worldData')
+            pool = Pool(workers)
+            openFunc = partial(loadWorldData, directory, useCache=config.GetBool('want-world-data-cache', True))
+            mapFunc = pool.map
+        else:
+            pool = ThreadPool(workers)
+            openFunc = self.openCompiledFile
+            mapFunc = pool.map
+
+        if self.profiler:
+            startTime = self.profiler.start('preloadFiles')
+
+        try:
+            while level:
+                nextLevel = []
+                for moduleName, objectStruct in zip(level, list(mapFunc(openFunc, level))):
+                    if objectStruct is None and not useProcesses:
+                        objectStruct = self.importFile(moduleName)
+                    elif useProcesses:
+                        # This is a copy sent back by the worker process.
+                        objectStruct = self.prepareFileData(objectStruct)
+                    if objectStruct is None:
+                        continue
+                    self.preloadedFiles[moduleName] = objectStruct
+                    for reference in getFileReferences(objectStruct, rootsOnly):
+                        if reference not in seen:
+                            seen.add(reference)
+                            nextLevel.append(reference)
+                level = nextLevel
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        if self.profiler:
+            self.profiler.stop('preloadFiles', startTime, fileName=', '.join(filenames))
+
     def openFile(self, filename):
         """
         This method imports Python world data modules.
         The directory of world data files can be specified in the
         config string 'world-data-dir'. By default, it is just
         'worldData'.
+
+        Files opened by preloadFiles are returned straight away, followed
+        by files in the attached shared store (see attachSharedStore), as
+        long as they match their source file when it is present.
+
+        If a world data module has an up to date cache file (see
+        WorldDataCache), the cache is read instead of importing the module.
+        This can be disabled with the config bool 'want-world-data-cache'.
+
+        With the config bool 'want-lazy-world-data', an up to date lazy
+        store (see WorldDataStore) is memory-mapped first, and objects
+        are only decoded when they are reached. At most 'world-data-lru-size'
+        decoded objects are kept.
         """
 
         objectStruct = None
@@ -189,8 +934,50 @@ class WorldCreatorBase(DirectObject):
         else:
             moduleName = filename
 
+        objectStruct = self.preloadedFiles.pop(moduleName, None)
+        if objectStruct is not None:
+            compileObjectIds(objectStruct.get('ObjectIds', {}))
+            return objectStruct
+
+        objectStruct = self.openCompiledFile(moduleName)
+        if objectStruct is not None:
+            return objectStruct
+
+        return self.importFile(moduleName)
+
+    def openCompiledFile(self, moduleName):
+        """
+        This opens a world data module from its compiled files, without
+        importing it, like openFile. None is returned if the module has
+        no up to date compiled file. Since nothing is imported, preloadFiles
+        calls this from its worker threads.
+        """
+
         directory = config.GetString('world-data-dir', 'worldData')
 
+        if self.sharedStore and self.sharedStore.hasModule(moduleName):
+            objectStruct = self.sharedStore.getFileData(moduleName, getSourcePath(directory, moduleName))
+            if objectStruct is not None:
+                return objectStruct
+
+        if config.GetBool('want-lazy-world-data', False):
+            setRecordCacheSize(config.GetInt('world-data-lru-size', 4096))
+            objectStruct = loadLazyWorldData(directory, moduleName)
+            if objectStruct is not None:
+                return objectStruct
+
+        if config.GetBool('want-world-data-cache', True):
+            objectStruct = loadCachedWorldData(directory, moduleName)
+            if objectStruct is not None:
+                return self.prepareFileData(objectStruct)
+
+    def importFile(self, moduleName):
+        """
+        This imports a world data module, like openFile.
+        """
+
+        directory = config.GetString('world-data-dir', 'worldData')
+        obj = None
         try:
             obj = import_module(directory + '.' + moduleName)
         except Exception as e:
@@ -207,8 +994,284 @@ class WorldCreatorBase(DirectObject):
                 newObj = getattr(obj, symbol, None)
 
         if newObj is not None:
+            # Parse the ObjectIds paths now, rather than on every lookup.
+            compileObjectIds(newObj.get('ObjectIds', {}))
             return newObj
 
+    def prepareFileData(self, objectStruct):
+        """
+        This converts an opened objectStruct into the form it is kept in.
+        If the config bool 'want-columnar-world-data' is set, its objects
+        are stored in a WorldObjectTable instead of nested dicts.
+
+        Only objectStructs that nothing else holds on to are converted,
+        such as ones read from a cache file. An imported module keeps its
+        objectStruct, so converting it would keep both copies around.
+        """
+
+        if not config.GetBool('want-columnar-world-data', False):
+            return objectStruct
+        if getObjectTable(objectStruct) or isLazyWorldData(objectStruct):
+            return objectStruct
+
+        return makeColumnarWorldData(objectStruct)
+
+    def getObjectTable(self, filename):
+        """
+        This returns the WorldObjectTable of a loaded file, or None
+        if its objects aren't stored in columns.
+        """
+
+        fileData = self.fileDicts.get(filename)
+        if fileData:
+            return getObjectTable(fileData)
+
+    def registerFileData(self, filename, fileData):
+        """
+        This stores the data of an opened world data file and adds
+        every UID defined in it to the UID index.
+        """
+
+        if filename in self.indexedFiles:
+            self.unregisterFileData(filename)
+
+        self.fileDicts[filename] = fileData
+        self.indexFileData(filename, fileData)
+        self.clearDerivedData()
+        self.dropAssetManifests(filename, fileData)
+        if filename not in self.lazyFiles:
+            self.getFileManifest(filename)
+        if config.GetBool('want-world-spatial-index', False):
+            self.addSpatialData(filename, fileData)
+            self.reindexOrphanedSpatialData(filename)
+
+    def unregisterFileData(self, filename):
+        """
+        This removes the data of a world data file and drops all
+        of its UIDs from the UID index.
+        """
+
+        fileData = self.fileDicts.pop(filename, None)
+        if filename not in self.indexedFiles:
+            return
+
+        self.clearDerivedData()
+        self.dropAssetManifests(filename, fileData)
+        self.removeSpatialData(filename)
+        self.indexedFiles.discard(filename)
+        self.lazyFiles.discard(filename)
+        self.sharedFiles.discard(filename)
+        self.fileOrder.pop(filename, None)
+        if fileData is None:
+            self.instanceTemplates = {}
+            self.rebuildUidIndex()
+            return
+
+        forgetObjectIds(fileData.get('ObjectIds', {}))
+        releaseLazyWorldData(fileData)
+        self.typeIndex.pop(filename, None)
+        for uid in fileData.get('ObjectIds', {}):
+            self.instanceTemplates.pop((filename, uid), None)
+            entries = self.uidIndex.get(uid)
+            if not entries:
+                continue
+            entries = [entry for entry in entries if entry[0] != filename]
+            if entries:
+                self.uidIndex[uid] = entries
+            else:
+                del self.uidIndex[uid]
+
+            parents = self.uidParents.get(uid)
+            if parents:
+                parents = [parent for parent in parents if parent[0] != filename]
+                if parents:
+                    self.uidParents[uid] = parents
+                else:
+                    del self.uidParents[uid]
+
+    def clearFileData(self):
+        """
+        This removes the data of every world data file along with
+        the UID index.
+        """
+
+        for fileData in self.fileDicts.values():
+            forgetObjectIds(fileData.get('ObjectIds', {}))
+        for name in self.lazyFiles:
+            releaseLazyWorldData(self.fileDicts.get(name, {}))
+
+        self.fileDicts = {}
+        self.uidIndex = {}
+        self.indexedFiles = set()
+        self.lazyFiles = set()
+        self.uidParents = {}
+        self.sharedFiles = set()
+        self.fileOrder = {}
+        self.typeIndex = {}
+        self.spatialIndexes = {}
+        self.spatialFiles = {}
+        self.fileHolders = {}
+        self.fileChildren = {}
+        self.instanceTemplates = {}
+        self.assetManifests = {}
+        self.fileManifests = {}
+        self.clearDerivedData()
+
+    def clearDerivedData(self):
+        """
+        This drops everything worked out from the file data that may
+        depend on any loaded file, such as object locations, since the
+        loaded files changed. Instance templates and asset manifests are
+        kept, since they are dropped per file (see dropAssetManifests).
+        """
+
+        self.objectLocations = {}
+
+    def dropAssetManifests(self, filename, fileData=None):
+        """
+        This drops the asset manifests that a registered or unregistered
+        file takes part in: its own file manifest, and the manifest of
+        every UID defined in the file or whose manifest names the file.
+        """
+
+        self.fileManifests.pop(filename, None)
+        if fileData is None:
+            self.assetManifests = {}
+            return
+
+        uids = fileData.get('ObjectIds', {})
+        for uid, manifest in list(self.assetManifests.items()):
+            if uid in uids or filename in manifest:
+                del self.assetManifests[uid]
+
+    def indexFileData(self, filename, fileData):
+        """
+        This adds every UID defined in a file's ObjectIds to the
+        UID index, along with a direct reference to its object data.
+
+        Lazily loaded files only index their UIDs, since holding
+        references would keep every object decoded. So do columnar
+        files, since every reference would be a view of its own.
+
+        The parent of each object is also recorded, which is taken
+        from its ObjectIds path.
+
+        Files from the shared store aren't indexed at all, since the
+        store's UID table already holds their UIDs and parents.
+        """
+
+        self.indexedFiles.add(filename)
+        self.fileOrder[filename] = self.nextFileOrder
+        self.nextFileOrder += 1
+        if isSharedWorldData(fileData):
+            self.sharedFiles.add(filename)
+            self.lazyFiles.add(filename)
+            return
+
+        objectIds = fileData.get('ObjectIds', {})
+        for uid in objectIds:
+            try:
+                path = parseObjectPath(objectIds[uid])
+            except ValueError:
+                continue
+            # Paths alternate between 'Objects' and UIDs, so the
+            # parent's UID comes two keys before the object's.
+            if len(path) >= 4:
+                self.uidParents.setdefault(uid, []).append((filename, path[-3]))
+
+        if isLazyWorldData(fileData) or getObjectTable(fileData):
+            self.lazyFiles.add(filename)
+            for uid in fileData.get('ObjectIds', {}):
+                self.uidIndex.setdefault(uid, []).append((filename, None))
+            return
+
+        fileTypes = {}
+        for uid in fileData.get('ObjectIds', {}):
+            try:
+                objectInfo = self.getObjectDataFromFileData(uid, fileData)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                self.notify.warning('Bad ObjectIds path for %s in %s: %s' % (uid, filename, e))
+                continue
+            self.uidIndex.setdefault(uid, []).append((filename, objectInfo))
+            fileTypes.setdefault(objectInfo.get('Type'), []).append(uid)
+
+        self.typeIndex[filename] = fileTypes
+
+    def rebuildUidIndex(self):
+        """
+        This rebuilds the UID index from the current file data.
+        """
+
+        self.uidIndex = {}
+        self.indexedFiles = set()
+        self.lazyFiles = set()
+        self.uidParents = {}
+        self.sharedFiles = set()
+        self.fileOrder = {}
+        self.typeIndex = {}
+        self.spatialIndexes = {}
+        self.spatialFiles = {}
+        self.clearDerivedData()
+        for name in self.fileDicts:
+            self.indexFileData(name, self.fileDicts[name])
+
+        if config.GetBool('want-world-spatial-index', False):
+            for name in self.fileDicts:
+                self.addSpatialData(name, self.fileDicts[name])
+
+    def getUidIndexEntries(self, uid):
+        """
+        This returns a list of (filename, objectInfo) entries for
+        every loaded file that defines the UID.
+        """
+
+        if len(self.indexedFiles) != len(self.fileDicts):
+            # Something wrote to fileDicts directly, so catch up.
+            self.rebuildUidIndex()
+
+        entries = self.uidIndex.get(uid, [])
+        if self.sharedFiles:
+            entries = self.sortByFileOrder(entries + [(name, None) for name in self.getSharedUidFiles(uid) if name in self.sharedFiles])
+        if self.lazyFiles:
+            entries = [(name, objectInfo if objectInfo is not None else self.getObjectDataFromFileData(uid, self.fileDicts[name])) for name, objectInfo in entries]
+
+        return entries
+
+    def getUidParents(self, uid):
+        """
+        This returns a list of (filename, parentUid) entries for every
+        loaded file that defines the UID below a parent object.
+        """
+
+        parents = self.uidParents.get(uid, [])
+        if self.sharedFiles and self.sharedStore:
+            parents = self.sortByFileOrder(parents + [(moduleName + '.py', parentUid) for moduleName, parentUid in self.sharedStore.getUidParents(uid) if moduleName + '.py' in self.sharedFiles])
+
+        return parents
+
+    def sortByFileOrder(self, entries):
+        """
+        This sorts (filename, ...) entries in the order their files were
+        registered, which is the order the UID index keeps them in.
+        """
+
+        if len(entries) < 2:
+            return entries
+
+        return sorted(entries, key=lambda entry: self.fileOrder.get(entry[0], 0))
+
+    def getObjectDataFromFileData(self, uid, fileData):
+        """
+        This will take a UID and return its object data from the
+        passed file data.
+        """
+
+        path = parseObjectPath(fileData['ObjectIds'][uid])
+        table = getObjectTable(fileData)
+        if table is not None and uid in table.rows:
+            return table.getView(table.rows[uid])
+        return resolveObjectPath(fileData, path)
+
     def getObjectDataByUid(self, uid, fileDict=None):
         """
         This will take a UID and look in all of the file data
@@ -216,22 +1279,31 @@ class WorldCreatorBase(DirectObject):
         as a key.
         """
 
-        if fileDict is None:
-            fileDict = self.fileDicts
-        objectInfo = None
-        for name in fileDict:
-            fileData = fileDict[name]
-            if not uid in fileData['ObjectIds']:
-                continue
+        return self.getObjectEntryByUid(uid, fileDict)[1]
 
-            # TODO: Secure this:
-            getSyntax = 'objectInfo = fileData' + fileData['ObjectIds'][uid]
-            exec getSyntax
+    def getObjectEntryByUid(self, uid, fileDict=None):
+        """
+        This works like getObjectDataByUid, but returns a (filename,
+        objectInfo) entry, so the file defining the object is known.
+        (None, None) is returned if the UID isn't defined.
+        """
 
-            if not 'File' in objectInfo or objectInfo.get('File') == '':
+        if self.profiler:
+            startTime = self.profiler.start('uidLookup')
+
+        if fileDict is None or fileDict is self.fileDicts:
+            entries = self.getUidIndexEntries(uid)
+        else:
+            entries = [(name, self.getObjectDataFromFileData(uid, fileDict[name])) for name in fileDict if uid in fileDict[name]['ObjectIds']]
+
+        entry = (None, None)
+        for entry in entries:
+            if not 'File' in entry[1] or entry[1].get('File') == '':
                 break
 
-        return objectInfo
+        if self.profiler:
+            self.profiler.stop('uidLookup', startTime)
+        return entry
 
     def getObjectDataFromFileByUid(self, uid, fileName):
         """
@@ -243,11 +1315,10 @@ class WorldCreatorBase(DirectObject):
         if fileName:
             if '.py' not in fileName:
                 fileName += '.py'
-            if self.isObjectDefined(uid, fileName):
-                fileData = self.fileDicts[fileName]
-                # TODO: Secure this:
-                getSyntax = 'objectInfo = fileData' + fileData['ObjectIds'][uid]
-                exec getSyntax
+            for name, fileObjectInfo in self.getUidIndexEntries(uid):
+                if name == fileName:
+                    objectInfo = fileObjectInfo
+                    break
         return objectInfo
 
     def getFilelistByUid(self, uid, fileDict = None):
@@ -256,81 +1327,357 @@ class WorldCreatorBase(DirectObject):
         and return the filelist that the UID is in.
         """
 
-        objectInfo = None
-        if not fileDict:
+        if not fileDict or fileDict is self.fileDicts:
             fileDict = self.fileDicts
+            entries = self.getUidIndexEntries(uid)
+        else:
+            entries = [(name, self.getObjectDataFromFileData(uid, fileDict[name])) for name in fileDict if uid in fileDict[name]['ObjectIds']]
 
         fileList = set()
-        for name in fileDict:
+        for name, objectInfo in entries:
             fileData = fileDict[name]
-            if not uid in fileData['ObjectIds']:
-                continue
-            # TODO: Replace this:
-            getSyntax = 'objectInfo = fileData' + fileData['ObjectIds'][uid]
-            exec getSyntax
             fileList.add(name)
             objects = objectInfo.get('Objects')
             if objects:
                 for obj in objects.values():
-                    visual = obj.get('Visual')
-                    if visual:
-                        model = visual.get('Model')
-                        if model:
-                            if type(model) is types.ListType:
-                                for currModel in model:
-                                    fileList.add(currModel + '.bam')
-                            else:
-                                fileList.add(model + '.bam')
+                    for model in getModelNames(obj):
+                        fileList.add(model + '.bam')
             objects = fileData.get('Objects')
             if objects:
                 for obj in objects.values():
-                    visual = obj.get('Visual')
-                    if visual:
-                        model = visual.get('Model')
-                        if model:
-                            fileList.add(model + '.bam')
+                    for model in getModelNames(obj):
+                        fileList.add(model + '.bam')
             if not 'File' in objectInfo or objectInfo.get('File') == '':
                 break
         return list(fileList)
 
+    def getFileTypeIndex(self, filename):
+        """
+        This returns a dictionary of object types to the UIDs of the
+        objects of that type in a loaded file. The index of a lazily
+        loaded file is only built when it is first asked for.
+        """
+
+        fileTypes = self.typeIndex.get(filename)
+        if fileTypes is None and filename in self.fileDicts:
+            fileTypes = {}
+            for uid in self.fileDicts[filename].get('ObjectIds', {}):
+                for name, objectInfo in self.getUidIndexEntries(uid):
+                    if name == filename:
+                        fileTypes.setdefault(objectInfo.get('Type'), []).append(uid)
+            self.typeIndex[filename] = fileTypes
+
+        return fileTypes or {}
+
+    def getObjectUidsByType(self, objectType, filename=None):
+        """
+        This returns the UIDs of every loaded object of a type,
+        optionally only the ones in the passed file.
+        """
+
+        if filename is not None:
+            return list(self.getFileTypeIndex(filename).get(objectType, []))
+
+        uids = []
+        seen = set()
+        for name in self.fileDicts:
+            for uid in self.getFileTypeIndex(name).get(objectType, []):
+                if uid not in seen:
+                    seen.add(uid)
+                    uids.append(uid)
+
+        return uids
+
+    def getObjectUidsByTypeUnder(self, objectType, ancestorUid):
+        """
+        This returns the UIDs of every loaded object of a type below the
+        object with the passed UID, such as all spawn nodes under a
+        Location, following parents across files.
+        """
+
+        uids = []
+        for uid in self.getObjectUidsByType(objectType):
+            if self.isObjectUnder(uid, ancestorUid):
+                uids.append(uid)
+
+        return uids
+
+    def isObjectUnder(self, objUid, ancestorUid):
+        """
+        This checks if an object is below the object with the passed UID.
+        """
+
+        visited = set()
+        curUid = objUid
+        while curUid and curUid not in visited:
+            visited.add(curUid)
+            parents = self.getUidParents(curUid)
+            if not parents:
+                return False
+            for name, parentUid in parents:
+                if parentUid == ancestorUid:
+                    return True
+            curUid = parents[0][1]
+
+        return False
+
+    def addSpatialData(self, filename, fileData):
+        """
+        This adds the position of every object in a file to the spatial
+        index of the Location it is in. Positions are relative to the
+        Location, and are worked out by composing the Pos, Hpr and Scale
+        of every parent below it. The grid cell size can be specified in
+        the config float 'world-spatial-cell-size'.
+
+        Objects whose Location isn't loaded yet are indexed under None,
+        until a file is registered that lets their Location be found
+        (see reindexOrphanedSpatialData).
+        """
+
+        cellSize = config.GetFloat('world-spatial-cell-size', 100.0)
+        entries = self.spatialFiles.setdefault(filename, [])
+        objects = fileData.get('Objects', {})
+        stack = []
+        for uid in objects.keys():
+            obj = objects[uid]
+            if obj.get('Type') == 'Location':
+                # The Location's own position is indexed
+                # by the file that references it.
+                stack.append((obj, uid, None))
+                continue
+            locationUid = self.getObjectLocationUid(uid)
+            self.addSpatialObject(entries, cellSize, locationUid, uid, obj, None)
+            stack.append((obj, locationUid, None))
+
+        while stack:
+            obj, locationUid, parentTransform = stack.pop()
+            children = obj.get('Objects')
+            if not children:
+                continue
+            transform = None
+            if obj.get('Type') != 'Location':
+                transform = getObjectTransform(obj, parentTransform)
+            for uid in children.keys():
+                child = children[uid]
+                self.addSpatialObject(entries, cellSize, locationUid, uid, child, transform)
+                if child.get('Type') == 'Location':
+                    stack.append((child, uid, None))
+                else:
+                    stack.append((child, locationUid, transform))
+
+    def addSpatialObject(self, entries, cellSize, locationUid, uid, obj, parentTransform):
+        if obj.get('Pos') is None:
+            return
+
+        spatialIndex = self.spatialIndexes.get(locationUid)
+        if spatialIndex is None:
+            spatialIndex = self.spatialIndexes[locationUid] = WorldSpatialIndex(cellSize)
+        spatialIndex.add(uid, getObjectTransform(obj, parentTransform)[0], obj.get('Type'))
+        entries.append((locationUid, uid))
+
+    def reindexOrphanedSpatialData(self, filename):
+        """
+        This indexes the files with objects under no Location again,
+        since the newly registered file may hold their Location.
+        """
+
+        for name in list(self.spatialFiles):
+            if name == filename or name not in self.fileDicts:
+                continue
+            for locationUid, uid in self.spatialFiles[name]:
+                if locationUid is None:
+                    self.removeSpatialData(name)
+                    self.addSpatialData(name, self.fileDicts[name])
+                    break
+
+    def removeSpatialData(self, filename):
+        """
+        This removes the objects of a file from the spatial indexes.
+        """
+
+        for locationUid, uid in self.spatialFiles.pop(filename, []):
+            spatialIndex = self.spatialIndexes.get(locationUid)
+            if spatialIndex is None:
+                continue
+            spatialIndex.remove(uid)
+            if not spatialIndex:
+                del self.spatialIndexes[locationUid]
+
+    def getSpatialIndex(self, locationUid):
+        """
+        This returns the spatial index (see WorldSpatialIndex) of a
+        Location, which can be asked for the objects within a radius or
+        box, or the nearest objects to a position. None is returned if
+        nothing in the Location is indexed. Spatial indexes are only built
+        with the config bool 'want-world-spatial-index'.
+        """
+
+        return self.spatialIndexes.get(locationUid)
+
+    def getAssetManifest(self, uid):
+        """
+        This will take a UID and return every asset needed to load it:
+        the world data files it is defined in, the .bam models of it and
+        everything below it, and, recursively, the files and models of
+        any File or AdditionalData it references. Only files that are
+        loaded or preloaded (see preloadFiles) can be looked into.
+
+        Referenced files are looked into through their file manifests
+        (see getFileManifest). Manifests are cached until a file they
+        take part in is registered or unregistered.
+        """
+
+        manifest = self.assetManifests.get(uid)
+        if manifest is None:
+            manifest = set()
+            visitedFiles = set()
+            for name, objectInfo in self.getUidIndexEntries(uid):
+                manifest.add(name)
+                visitedFiles.add(name)
+                self.addObjectAssets(objectInfo, manifest)
+
+            references = [name for name in manifest if name.endswith('.py')]
+            while references:
+                name = references.pop()
+                if name in visitedFiles:
+                    continue
+                visitedFiles.add(name)
+                fileManifest = self.getFileManifest(name)
+                manifest.update(fileManifest)
+                references.extend([reference for reference in fileManifest if reference.endswith('.py')])
+
+            manifest = frozenset(manifest)
+            self.assetManifests[uid] = manifest
+
+        return manifest
+
+    def getFileManifest(self, filename):
+        """
+        This returns the models and directly referenced files of every
+        object in a loaded or preloaded file. File manifests are built
+        when a file is registered, unless it is lazily loaded, and are
+        otherwise built the first time they are asked for.
+        """
+
+        manifest = self.fileManifests.get(filename)
+        if manifest is None:
+            fileData = self.fileDicts.get(filename) or self.preloadedFiles.get(filename[:-3])
+            if not fileData:
+                return frozenset()
+
+            manifest = set()
+            for rootObj in fileData.get('Objects', {}).values():
+                self.addObjectAssets(rootObj, manifest)
+            manifest = frozenset(manifest)
+            self.fileManifests[filename] = manifest
+
+        return manifest
+
+    def addObjectAssets(self, objectInfo, manifest):
+        """
+        This adds the models and referenced files of an object and
+        everything below it to an asset manifest.
+        """
+
+        objects = [objectInfo]
+        objects.extend([obj for uid, obj, parentUid in walkObjects(objectInfo.get('Objects') or {})])
+        for obj in objects:
+            for model in getModelNames(obj):
+                manifest.add(model + '.bam')
+
+            for reference in obj.get('AdditionalData', []):
+                manifest.add(reference + '.py')
+            if obj.get('File'):
+                manifest.add(obj['File'] + '.py')
+
     def getObjectLocationUid(self, objUid, fileDict=None):
         """
         This will take an object's UID and optionally a passed file
         dictionary and return the current object's location's UID.
         """
 
-        if not fileDict:
-            fileDict = self.fileDicts
-        found = False
+        location = self.getObjectLocation(objUid, fileDict)
+        if location:
+            return location[0]
+
+    def getObjectLocation(self, objUid, fileDict=None):
+        """
+        This will take an object's UID and optionally a passed file
+        dictionary and return a (locationUid, isPrivate) tuple for the
+        nearest Location that contains the object, or the object itself
+        if it is a Location. None is returned if there is no Location.
+
+        The location is found by following parent UIDs, including into
+        the files that reference the object's file, and is remembered
+        until the loaded files change.
+        """
+
+        objUid = str(objUid)
+        if fileDict and fileDict is not self.fileDicts:
+            return self.findObjectLocation(objUid, fileDict)
+
+        if objUid in self.objectLocations:
+            return self.objectLocations[objUid]
+
+        if len(self.indexedFiles) != len(self.fileDicts):
+            self.rebuildUidIndex()
+
+        chain = []
+        location = None
+        curUid = objUid
+        while curUid and curUid not in chain:
+            if curUid in self.objectLocations:
+                location = self.objectLocations[curUid]
+                break
+            chain.append(curUid)
+            if self.isLocation(self.getUidIndexEntries(curUid)):
+                location = (curUid, False)
+                break
+            parents = self.getUidParents(curUid)
+            curUid = parents[0][1] if parents else None
+
+        # Every object passed on the way up is in the same location.
+        for uid in chain:
+            self.objectLocations[uid] = location
+
+        return location
+
+    def findObjectLocation(self, objUid, fileDict):
+        """
+        This finds an object's location like getObjectLocation,
+        but by searching the passed file dictionary.
+        """
+
+        chain = []
         curUid = objUid
-        isPrivate = False
-        while curUid:
-            curFile = None
+        while curUid and curUid not in chain:
+            chain.append(curUid)
+            entries = []
+            parentUid = None
             for name in fileDict:
-                fileData = fileDict[name]
-                if not str(curUid) in fileData['ObjectIds']:
+                objectIds = fileDict[name]['ObjectIds']
+                if curUid not in objectIds:
                     continue
+                entries.append((name, self.getObjectDataFromFileData(curUid, fileDict[name])))
+                path = parseObjectPath(objectIds[curUid])
+                if len(path) >= 4 and parentUid is None:
+                    parentUid = path[-3]
+            if self.isLocation(entries):
+                return (curUid, False)
+            curUid = parentUid
 
-                if str(curUid) in fileData['Objects']:
-                    if fileData['Objects'][str(curUid)].get('Type') == 'Location':
-                        return (str(curUid), isPrivate)
-                    continue
+        return
 
-                objData = fileData['Objects'].values()[0]['Objects']
-                if str(curUid) in objData:
-                    if objData[str(curUid)].get('Type') == 'Location':
-                        return str(curUid)
-                curFile = fileData
-                break
+    def isLocation(self, entries):
+        """
+        This checks if any of a UID's index entries is a Location.
+        """
 
-            if not curFile:
-                return
-            else:
-                curUid = curFile.get('Objects', {}).keys()[0]
-                if curFile['Objects'][str(curUid)].get('Type') == 'Location':
-                    return curUid
+        for name, objectInfo in entries:
+            if objectInfo.get('Type') == 'Location':
+                return True
 
-        return
+        return False
 
     def isObjectDefined(self, objUid, fileName):
         """
@@ -348,32 +1695,89 @@ class WorldCreatorBase(DirectObject):
         """
         This will call loadObjectDict with delayed time.
         (up to applications to use startTime)
+
+        If the config bool 'want-time-sliced-loading' is set, the objects
+        are loaded over several frames by loadObjectDictTimeSliced instead.
         """
 
         if hasattr(parentObj, 'loadZoneObjects'):
             parentObj.loadZoneObjects(zoneLevel)
+        elif config.GetBool('want-time-sliced-loading', False):
+            self.loadObjectDictTimeSliced(objDict, parentObj, parentUid, dynamic, zoneLevel=zoneLevel)
         else:
             startTime = globalClock.getRealTime()
             self.loadObjectDict(objDict, parentObj, parentUid, dynamic, zoneLevel=zoneLevel, startTime=startTime)
 
-    def registerPostLoadCall(self, funcCall):
+    def registerPostLoadCall(self, funcCall, priority=0):
         """
         This registers a function to call after something
         in the world is loaded.
+
+        A function is only called once no matter how many times it is
+        registered before the calls are processed. If it is registered
+        again after being called, while the calls are still being processed,
+        it is not called again. Functions with lower priorities are called first.
         """
 
-        self.postLoadCalls.append(funcCall)
+        self.postLoadCalls.add(funcCall, priority)
 
-    def processPostLoadCalls(self):
+    def processPostLoadCalls(self, frameBudget=None):
         """
         This calls functions in the list after something in the world
         is loaded.
+
+        If a frame budget (in milliseconds) is passed, or specified in the
+        config float 'world-post-load-frame-budget', calls stop once it is
+        used up and carry on in the following frames. Returns True if every
+        function was called.
+        """
+
+        if frameBudget is None:
+            frameBudget = config.GetFloat('world-post-load-frame-budget', 0.0)
+
+        done = self.dispatchPostLoadCalls(frameBudget)
+        if not done and not self.postLoadTask:
+            self.postLoadTask = 'worldCreatorPostLoad-%s' % id(self)
+            taskMgr.add(self.postLoadCallsTask, self.postLoadTask, extraArgs=[frameBudget], appendTask=True)
+
+        return done
+
+    def dispatchPostLoadCalls(self, frameBudget):
+        """
+        This calls functions in the list until the frame budget is used up.
+        """
+
+        if self.profiler:
+            startTime = self.profiler.start('postLoadCalls')
+
+        budget = None
+        if frameBudget > 0:
+            budget = frameBudget / 1000.0
+        done = self.postLoadCalls.dispatch(budget, self.profiler)
+
+        if self.profiler:
+            self.profiler.stop('postLoadCalls', startTime)
+
+        return done
+
+    def postLoadCallsTask(self, frameBudget, task):
+        """
+        This carries on calling post load functions a frame at a time.
+        """
+
+        if self.dispatchPostLoadCalls(frameBudget):
+            self.postLoadTask = None
+            return task.done
+
+        return task.cont
+
+    def cancelPostLoadCalls(self):
+        """
+        This drops every post load function that hasn't been called yet.
         """
 
-        functionsCalled = []
-        for currObj in self.postLoadCalls:
-            if currObj not in functionsCalled:
-                functionsCalled.append(currObj)
-                currObj()
+        if self.postLoadTask:
+            taskMgr.remove(self.postLoadTask)
+            self.postLoadTask = None
 
-        self.postLoadCalls = []
\ No newline at end of file
+        self.postLoadCalls.clear()
\ No newline at end of file
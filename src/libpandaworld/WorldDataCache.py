@@ -0,0 +1,238 @@
+from direct.directnotify.DirectNotifyGlobal import directNotify
+from libpandaworld.WorldDataUtils import compileObjectIds, primeObjectPaths
+from importlib import import_module
+import os, sys, struct, hashlib
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+notify = directNotify.newCategory('WorldDataCache')
+
+CACHE_MAGIC = b'LPWC'
+CACHE_VERSION = 2
+CACHE_EXTENSION = '.wdc'
+CACHE_HEADER = struct.Struct('<4sH20sQd')
+NO_SOURCE_HASH = b'\0' * 20
+NO_SOURCE_STAMP = (0, 0.0)
+
+def getWorldDataPath(directory):
+    """
+    This returns the filesystem directory of a world data package,
+    or None if it can't be found.
+    """
+
+    try:
+        package = import_module(directory)
+    except ImportError:
+        return
+
+    paths = list(getattr(package, '__path__', []))
+    if paths:
+        return paths[0]
+
+def getSourcePath(directory, moduleName):
+    """
+    This returns the path of a world data module's source file.
+    """
+
+    path = getWorldDataPath(directory)
+    if path:
+        return os.path.join(path, moduleName + '.py')
+
+def getCachePath(directory, moduleName):
+    """
+    This returns the path of a world data module's cache file.
+    """
+
+    path = getWorldDataPath(directory)
+    if path:
+        return os.path.join(path, moduleName + CACHE_EXTENSION)
+
+def hashSource(sourcePath):
+    """
+    This returns the SHA-1 digest of a source file, or None
+    if the source file doesn't exist.
+    """
+
+    if not sourcePath or not os.path.exists(sourcePath):
+        return
+
+    with open(sourcePath, 'rb') as sourceFile:
+        return hashlib.sha1(sourceFile.read()).digest()
+
+def getSourceStamp(sourcePath):
+    """
+    This returns the (size, mtime) of a source file, or None
+    if the source file doesn't exist.
+    """
+
+    if not sourcePath:
+        return
+
+    try:
+        stat = os.stat(sourcePath)
+    except OSError:
+        return
+
+    return (stat.st_size, stat.st_mtime)
+
+def isSourceCurrent(sourcePath, sourceHash, sourceStamp):
+    """
+    This checks if compiled data still matches its source file. The
+    source's size and mtime are compared first, and it is only hashed
+    if they changed. Compiled data is trusted if there is no source.
+    """
+
+    stamp = getSourceStamp(sourcePath)
+    if stamp is None:
+        return True
+    if tuple(sourceStamp) == stamp:
+        return True
+
+    return hashSource(sourcePath) == sourceHash
+
+def importWorldData(directory, moduleName):
+    """
+    This imports a world data module and returns its objectStruct.
+    """
+
+    module = import_module(directory + '.' + moduleName)
+    return getattr(module, 'objectStruct', None)
+
+def writeWorldDataCache(cachePath, objectStruct, sourceHash=None, sourceStamp=None):
+    """
+    This writes an objectStruct, along with its parsed ObjectIds
+    paths, to a cache file. The source's hash and (size, mtime)
+    are stored to check if the cache is up to date.
+    """
+
+    payload = {
+        'objectStruct': objectStruct,
+        'objectPaths': compileObjectIds(objectStruct.get('ObjectIds', {}))}
+    sourceSize, sourceMtime = sourceStamp or NO_SOURCE_STAMP
+    header = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, sourceHash or NO_SOURCE_HASH, sourceSize, sourceMtime)
+
+    # Write to a temporary file first, so a running process never
+    # reads a half written cache.
+    tempPath = cachePath + '.tmp'
+    with open(tempPath, 'wb') as cacheFile:
+        cacheFile.write(header)
+        pickle.dump(payload, cacheFile, pickle.HIGHEST_PROTOCOL)
+
+    if os.path.exists(cachePath):
+        os.remove(cachePath)
+    os.rename(tempPath, cachePath)
+
+def readWorldDataCache(cachePath, sourcePath=None):
+    """
+    This reads an objectStruct from a cache file. None is returned
+    if the cache is missing, corrupt or doesn't match the source file.
+    """
+
+    if not cachePath or not os.path.exists(cachePath):
+        return
+
+    try:
+        with open(cachePath, 'rb') as cacheFile:
+            magic, version, cacheHash, sourceSize, sourceMtime = CACHE_HEADER.unpack(cacheFile.read(CACHE_HEADER.size))
+            if magic != CACHE_MAGIC or version != CACHE_VERSION:
+                return
+            if sourcePath is not None and not isSourceCurrent(sourcePath, cacheHash, (sourceSize, sourceMtime)):
+                return
+            payload = pickle.load(cacheFile)
+    except Exception as e:
+        notify.warning('Could not read %s: %s' % (cachePath, e))
+        return
+
+    objectStruct = payload['objectStruct']
+    primeObjectPaths(objectStruct.get('ObjectIds', {}), payload['objectPaths'])
+    return objectStruct
+
+def loadCachedWorldData(directory, moduleName):
+    """
+    This returns a world data module's objectStruct from its cache file,
+    or None if there is no up to date cache.
+    """
+
+    cachePath = getCachePath(directory, moduleName)
+    if not cachePath or not os.path.exists(cachePath):
+        return
+
+    return readWorldDataCache(cachePath, getSourcePath(directory, moduleName))
+
+def loadWorldData(directory, moduleName, useCache=True):
+    """
+    This returns a world data module's objectStruct, reading its cache
+    file if it is up to date and importing the module otherwise.
+    """
+
+    if useCache:
+        objectStruct = loadCachedWorldData(directory, moduleName)
+        if objectStruct is not None:
+            return objectStruct
+
+    return importWorldData(directory, moduleName)
+
+def compileWorldData(directory, moduleName):
+    """
+    This imports a world data module and writes its cache file.
+    """
+
+    objectStruct = importWorldData(directory, moduleName)
+    if objectStruct is None:
+        notify.warning('%s.%s has no objectStruct' % (directory, moduleName))
+        return
+
+    cachePath = getCachePath(directory, moduleName)
+    sourcePath = getSourcePath(directory, moduleName)
+    writeWorldDataCache(cachePath, objectStruct, hashSource(sourcePath), getSourceStamp(sourcePath))
+    return cachePath
+
+def getWorldDataModules(directory):
+    """
+    This returns the names of every world data module in a world data package.
+    """
+
+    path = getWorldDataPath(directory)
+    if not path:
+        return []
+
+    moduleNames = []
+    for filename in sorted(os.listdir(path)):
+        moduleName, extension = os.path.splitext(filename)
+        if extension == '.py' and moduleName != '__init__':
+            moduleNames.append(moduleName)
+
+    return moduleNames
+
+def compileWorldDataDir(directory):
+    """
+    This writes a cache file for every world data module in a world data package.
+    """
+
+    cachePaths = []
+    for moduleName in getWorldDataModules(directory):
+        cachePath = compileWorldData(directory, moduleName)
+        if cachePath:
+            cachePaths.append(cachePath)
+
+    return cachePaths
+
+def main(args=None):
+    """
+    Compiles the cache files of a world data package:
+        python -m libpandaworld.WorldDataCache [world-data-dir]
+    """
+
+    if args is None:
+        args = sys.argv[1:]
+
+    directory = args[0] if args else 'worldData'
+    sys.path.insert(0, os.getcwd())
+    for cachePath in compileWorldDataDir(directory):
+        print(cachePath)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
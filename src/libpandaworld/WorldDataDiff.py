@@ -0,0 +1,82 @@
+from libpandaworld.WorldDataUtils import walkObjects
+
+class WorldDataDiff(object):
+    """
+    This holds the objects that were added, removed or changed between
+    two versions of a world data file.
+
+    Added objects are ordered parents first and removed objects children
+    first, so they can be created and destroyed in order. An object counts
+    as changed if any of its fields other than Objects changed, or if it
+    moved to a different parent.
+    """
+
+    def __init__(self, added, removed, changed):
+        # (uid, objectData, parentUid)
+        self.added = added
+        self.removed = removed
+
+        # (uid, oldObjectData, newObjectData, parentUid)
+        self.changed = changed
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+    def hasChanges(self):
+        return len(self) > 0
+
+    def getUids(self):
+        """
+        This returns the UIDs of every added, removed and changed object.
+        """
+
+        uids = set([entry[0] for entry in self.added])
+        uids.update([entry[0] for entry in self.removed])
+        uids.update([entry[0] for entry in self.changed])
+        return uids
+
+def getObjectFields(obj):
+    """
+    This returns an object's fields, without its child objects.
+    """
+
+    fields = {}
+    for key in obj.keys():
+        if key != 'Objects':
+            fields[key] = obj[key]
+
+    return fields
+
+def diffWorldData(oldData, newData):
+    """
+    This compares the objects of two versions of a world data
+    file and returns a WorldDataDiff.
+    """
+
+    oldObjects = {}
+    oldOrder = []
+    for uid, obj, parentUid in walkObjects(oldData.get('Objects', {})):
+        oldObjects[uid] = (obj, parentUid)
+        oldOrder.append(uid)
+
+    added = []
+    changed = []
+    newUids = set()
+    for uid, obj, parentUid in walkObjects(newData.get('Objects', {})):
+        newUids.add(uid)
+        oldEntry = oldObjects.get(uid)
+        if oldEntry is None:
+            added.append((uid, obj, parentUid))
+            continue
+
+        oldObj, oldParentUid = oldEntry
+        if oldParentUid != parentUid or getObjectFields(oldObj) != getObjectFields(obj):
+            changed.append((uid, oldObj, obj, parentUid))
+
+    removed = []
+    for uid in reversed(oldOrder):
+        if uid not in newUids:
+            oldObj, parentUid = oldObjects[uid]
+            removed.append((uid, oldObj, parentUid))
+
+    return WorldDataDiff(added, removed, changed)
\ No newline at end of file
@@ -0,0 +1,365 @@
+from direct.directnotify.DirectNotifyGlobal import directNotify
+from libpandaworld.WorldDataCache import getSourcePath, getSourceStamp, getWorldDataModules, getWorldDataPath, hashSource, importWorldData
+from libpandaworld.WorldDataStore import LazyWorldData, writeLazyWorldData
+from libpandaworld.WorldDataUtils import parseObjectPath
+import os, sys, mmap, struct
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+notify = directNotify.newCategory('WorldDataSharedStore')
+
+SHARED_MAGIC = b'LPWS'
+SHARED_VERSION = 3
+SHARED_FILENAME = 'world.wds'
+SHARED_HEADER = struct.Struct('<4sHQQQQI')
+SHARED_UID_ENTRY = struct.Struct('<IHHIHII')
+SHARED_MODULE_ENTRY = struct.Struct('<I')
+
+sharedStores = {}
+
+def encodeUid(uid):
+    if isinstance(uid, bytes):
+        return uid
+    return uid.encode('utf-8')
+
+def decodeUid(data):
+    if str is bytes:
+        return data
+    return data.decode('utf-8')
+
+class SharedObjectIds(Mapping):
+    """
+    This is the read-only ObjectIds table of a module in a shared store.
+    Paths are read straight from the mapped UID table when they are looked
+    up, so the table is never decoded into a dictionary.
+
+    keys, values and items return lists like a Python 2 dict, since the
+    world creators index into them.
+    """
+
+    def __init__(self, store, moduleIndex):
+        self.store = store
+        self.moduleIndex = moduleIndex
+
+    def __getitem__(self, uid):
+        index = self.store.findUidEntry(uid, self.moduleIndex)
+        if index is None:
+            raise KeyError(uid)
+        return self.store.getEntryPath(index)
+
+    def __contains__(self, uid):
+        return self.store.findUidEntry(uid, self.moduleIndex) is not None
+
+    def __iter__(self):
+        for index in self.store.getModuleEntries(self.moduleIndex):
+            yield self.store.getEntryUid(index)
+
+    def __len__(self):
+        return self.store.modules[self.moduleIndex][3]
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self.store.getEntryPath(index) for index in self.store.getModuleEntries(self.moduleIndex)]
+
+    def items(self):
+        return list(zip(self.keys(), self.values()))
+
+class SharedWorldData(object):
+    """
+    This is a memory-mapped file holding the lazy stores (see WorldDataStore)
+    of every world data module in a world, along with a sorted table of
+    every UID, the modules defining it, and its parent UID and ObjectIds
+    path in each of them.
+
+    The file is written once, and every process on a host maps the same
+    pages, so memory grows with the number of worlds rather than districts.
+    The UID table is searched in place and never decoded, and it stands in
+    for the ObjectIds of every module in the store (see SharedObjectIds).
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        magic, version, directoryOffset, self.uidTableOffset, self.moduleTableOffset, self.stringOffset, self.uidCount = SHARED_HEADER.unpack_from(buffer, 0)
+        if magic != SHARED_MAGIC or version != SHARED_VERSION:
+            raise ValueError('Not a shared world data store')
+
+        # (moduleName, storeOffset, firstModuleEntry, moduleEntryCount)
+        self.modules = pickle.loads(buffer[directoryOffset:self.uidTableOffset])
+        self.moduleIndexes = dict([(module[0], moduleIndex) for moduleIndex, module in enumerate(self.modules)])
+        self.stores = {}
+
+    def getModuleNames(self):
+        return [module[0] for module in self.modules]
+
+    def hasModule(self, moduleName):
+        return moduleName in self.moduleIndexes
+
+    def getFileData(self, moduleName, sourcePath=None):
+        """
+        This returns a module's lazily loaded data, or None if the module
+        isn't in the store or doesn't match its source file. Every world
+        creator in a process shares the same data.
+        """
+
+        store = self.stores.get(moduleName)
+        if store is None:
+            moduleIndex = self.moduleIndexes.get(moduleName)
+            if moduleIndex is None:
+                return
+            store = LazyWorldData(self.buffer, self.modules[moduleIndex][1])
+            store.root['ObjectIds'] = SharedObjectIds(self, moduleIndex)
+            self.stores[moduleName] = store
+
+        if sourcePath is not None and not store.isCurrent(sourcePath):
+            return
+
+        return store.root
+
+    def getString(self, offset, length):
+        start = self.stringOffset + offset
+        return self.buffer[start:start + length]
+
+    def getUidEntry(self, index):
+        uidOffset, uidLength, moduleIndex, parentOffset, parentLength, pathOffset, pathLength = SHARED_UID_ENTRY.unpack_from(self.buffer, self.uidTableOffset + index * SHARED_UID_ENTRY.size)
+        return self.getString(uidOffset, uidLength), moduleIndex
+
+    def getEntryUid(self, index):
+        return decodeUid(self.getUidEntry(index)[0])
+
+    def getEntryParent(self, index):
+        entry = SHARED_UID_ENTRY.unpack_from(self.buffer, self.uidTableOffset + index * SHARED_UID_ENTRY.size)
+        if entry[4]:
+            return decodeUid(self.getString(entry[3], entry[4]))
+
+    def getEntryPath(self, index):
+        entry = SHARED_UID_ENTRY.unpack_from(self.buffer, self.uidTableOffset + index * SHARED_UID_ENTRY.size)
+        return decodeUid(self.getString(entry[5], entry[6]))
+
+    def getModuleEntries(self, moduleIndex):
+        """
+        This returns the UID table indexes of every UID in a module.
+        """
+
+        moduleName, storeOffset, firstEntry, entryCount = self.modules[moduleIndex]
+        offset = self.moduleTableOffset + firstEntry * SHARED_MODULE_ENTRY.size
+        return [SHARED_MODULE_ENTRY.unpack_from(self.buffer, offset + i * SHARED_MODULE_ENTRY.size)[0] for i in range(entryCount)]
+
+    def getUidEntries(self, uid):
+        """
+        This returns the UID table indexes of every module defining a UID.
+        """
+
+        uid = encodeUid(uid)
+        low = 0
+        high = self.uidCount
+        while low < high:
+            middle = (low + high) // 2
+            if self.getUidEntry(middle)[0] < uid:
+                low = middle + 1
+            else:
+                high = middle
+
+        indexes = []
+        while low < self.uidCount and self.getUidEntry(low)[0] == uid:
+            indexes.append(low)
+            low += 1
+
+        return indexes
+
+    def findUidEntry(self, uid, moduleIndex):
+        """
+        This returns the UID table index of a UID in a module, or None
+        if the module doesn't define the UID.
+        """
+
+        for index in self.getUidEntries(uid):
+            if self.getUidEntry(index)[1] == moduleIndex:
+                return index
+
+    def getUidModules(self, uid):
+        """
+        This returns the names of every module defining a UID.
+        """
+
+        return [self.modules[self.getUidEntry(index)[1]][0] for index in self.getUidEntries(uid)]
+
+    def getUidParents(self, uid):
+        """
+        This returns a list of (moduleName, parentUid) entries for every
+        module defining a UID below a parent object.
+        """
+
+        parents = []
+        for index in self.getUidEntries(uid):
+            parentUid = self.getEntryParent(index)
+            if parentUid is not None:
+                parents.append((self.modules[self.getUidEntry(index)[1]][0], parentUid))
+
+        return parents
+
+    def release(self):
+        for store in self.stores.values():
+            store.release()
+
+def isSharedWorldData(fileData):
+    """
+    This checks if a file's data comes from a shared store.
+    """
+
+    return isinstance(fileData.get('ObjectIds'), SharedObjectIds)
+
+def writeSharedWorldData(storeFile, objectStructs):
+    """
+    This writes a list of (moduleName, objectStruct, sourceHash, sourceStamp)
+    entries as a shared world data store to an open file.
+    """
+
+    storeFile.write(b'\0' * SHARED_HEADER.size)
+
+    modules = []
+    uidEntries = []
+    for moduleName, objectStruct, sourceHash, sourceStamp in sorted(objectStructs, key=lambda entry: entry[0]):
+        moduleIndex = len(modules)
+        objectIds = objectStruct.get('ObjectIds', {})
+        modules.append([moduleName, storeFile.tell(), 0, len(objectIds)])
+        # The ObjectIds are left out of the module's root record,
+        # since the UID table stands in for them.
+        writeLazyWorldData(storeFile, objectStruct, sourceHash, sourceStamp, withObjectIds=False)
+        for uid in objectIds:
+            path = parseObjectPath(objectIds[uid])
+            # Paths alternate between 'Objects' and UIDs, so the
+            # parent's UID comes two keys before the object's.
+            parentUid = path[-3] if len(path) >= 4 else ''
+            uidEntries.append((encodeUid(uid), moduleIndex, encodeUid(parentUid), encodeUid(objectIds[uid])))
+
+    uidEntries.sort()
+    moduleEntries = [[] for module in modules]
+    for index, entry in enumerate(uidEntries):
+        moduleEntries[entry[1]].append(index)
+    firstEntry = 0
+    for moduleIndex, module in enumerate(modules):
+        module[2] = firstEntry
+        firstEntry += len(moduleEntries[moduleIndex])
+
+    directoryOffset = storeFile.tell()
+    pickle.dump([tuple(module) for module in modules], storeFile, pickle.HIGHEST_PROTOCOL)
+
+    uidTableOffset = storeFile.tell()
+    strings = []
+    stringOffset = 0
+    for uid, moduleIndex, parentUid, path in uidEntries:
+        storeFile.write(SHARED_UID_ENTRY.pack(stringOffset, len(uid), moduleIndex, stringOffset + len(uid), len(parentUid), stringOffset + len(uid) + len(parentUid), len(path)))
+        strings.append(uid + parentUid + path)
+        stringOffset += len(strings[-1])
+
+    moduleTableOffset = storeFile.tell()
+    for indexes in moduleEntries:
+        for index in indexes:
+            storeFile.write(SHARED_MODULE_ENTRY.pack(index))
+
+    stringTableOffset = storeFile.tell()
+    for string in strings:
+        storeFile.write(string)
+
+    storeFile.seek(0)
+    storeFile.write(SHARED_HEADER.pack(SHARED_MAGIC, SHARED_VERSION, directoryOffset, uidTableOffset, moduleTableOffset, stringTableOffset, len(uidEntries)))
+
+def getSharedStorePath(directory):
+    """
+    This returns the path of a world data package's shared store file.
+    """
+
+    path = getWorldDataPath(directory)
+    if path:
+        return os.path.join(path, SHARED_FILENAME)
+
+def compileSharedWorldData(directory, storePath=None):
+    """
+    This imports every world data module in a world data package
+    and writes them to a shared store file.
+    """
+
+    if storePath is None:
+        storePath = getSharedStorePath(directory)
+    if not storePath:
+        notify.warning('%s is not a world data package' % directory)
+        return
+
+    objectStructs = []
+    for moduleName in getWorldDataModules(directory):
+        objectStruct = importWorldData(directory, moduleName)
+        if objectStruct is None:
+            notify.warning('%s.%s has no objectStruct' % (directory, moduleName))
+            continue
+        sourcePath = getSourcePath(directory, moduleName)
+        objectStructs.append((moduleName, objectStruct, hashSource(sourcePath), getSourceStamp(sourcePath)))
+
+    writeSharedWorldDataFile(storePath, objectStructs)
+    return storePath
+
+def writeSharedWorldDataFile(storePath, objectStructs):
+    """
+    This writes a list of (moduleName, objectStruct, sourceHash,
+    sourceStamp) entries to a shared store file.
+    """
+
+    tempPath = storePath + '.tmp'
+    with open(tempPath, 'wb') as storeFile:
+        writeSharedWorldData(storeFile, objectStructs)
+
+    if os.path.exists(storePath):
+        os.remove(storePath)
+    os.rename(tempPath, storePath)
+
+def openSharedWorldData(storePath):
+    """
+    This memory-maps a shared store file. A store is only mapped once per
+    process. None is returned if the store is missing or corrupt.
+    """
+
+    store = sharedStores.get(storePath)
+    if store is not None:
+        return store
+
+    if not storePath or not os.path.exists(storePath):
+        return
+
+    try:
+        with open(storePath, 'rb') as storeFile:
+            buffer = mmap.mmap(storeFile.fileno(), 0, access=mmap.ACCESS_READ)
+        store = SharedWorldData(buffer)
+    except Exception as e:
+        notify.warning('Could not open %s: %s' % (storePath, e))
+        return
+
+    sharedStores[storePath] = store
+    return store
+
+def main(args=None):
+    """
+    Compiles the shared store file of a world data package:
+        python -m libpandaworld.WorldDataSharedStore [world-data-dir] [store-file]
+    """
+
+    if args is None:
+        args = sys.argv[1:]
+
+    directory = args[0] if args else 'worldData'
+    storePath = args[1] if len(args) > 1 else None
+    sys.path.insert(0, os.getcwd())
+    storePath = compileSharedWorldData(directory, storePath)
+    if storePath:
+        print(storePath)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
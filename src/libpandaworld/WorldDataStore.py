@@ -0,0 +1,319 @@
+from direct.directnotify.DirectNotifyGlobal import directNotify
+from libpandaworld.WorldDataUtils import compileObjectIds, primeObjectPaths
+from libpandaworld.WorldDataCache import NO_SOURCE_STAMP, getCachePath, getSourcePath, getSourceStamp, getWorldDataModules, hashSource, importWorldData, isSourceCurrent
+from collections import OrderedDict
+import os, sys, mmap, struct
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+notify = directNotify.newCategory('WorldDataStore')
+
+STORE_MAGIC = b'LPWL'
+STORE_VERSION = 2
+STORE_EXTENSION = '.wdl'
+STORE_HEADER = struct.Struct('<4sH20sQdQI')
+STORE_TABLE_ENTRY = struct.Struct('<Q')
+STORE_SPAN = struct.Struct('<QQ')
+NO_SOURCE_HASH = b'\0' * 20
+
+class RecordCache(object):
+    """
+    This is an LRU cache of decoded world data records, shared by
+    every lazily loaded world data file.
+    """
+
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.records = OrderedDict()
+
+    def setMaxSize(self, maxSize):
+        self.maxSize = maxSize
+        self.trim()
+
+    def get(self, key):
+        record = self.records.pop(key, None)
+        if record is not None:
+            self.records[key] = record
+        return record
+
+    def add(self, key, record):
+        self.records[key] = record
+        self.trim()
+
+    def discard(self, storeId):
+        for key in [key for key in self.records if key[0] == storeId]:
+            del self.records[key]
+
+    def trim(self):
+        while len(self.records) > self.maxSize:
+            self.records.popitem(last=False)
+
+recordCache = RecordCache(4096)
+
+def setRecordCacheSize(maxSize):
+    """
+    This sets how many decoded records are kept before the least
+    recently used ones are released.
+    """
+
+    recordCache.setMaxSize(maxSize)
+
+class LazyObjectDict(Mapping):
+    """
+    This is a read-only Objects dictionary whose values are only decoded
+    from the backing store when they are accessed.
+
+    keys, values and items return lists like a Python 2 dict, since the
+    world creators index into them.
+    """
+
+    def __init__(self, store, childKeys, childIds):
+        self.store = store
+        self.childIds = dict(zip(childKeys, childIds))
+
+    def __getitem__(self, key):
+        return self.store.getRecord(self.childIds[key])
+
+    def __contains__(self, key):
+        return key in self.childIds
+
+    def __iter__(self):
+        return iter(self.childIds)
+
+    def __len__(self):
+        return len(self.childIds)
+
+    def keys(self):
+        return list(self.childIds)
+
+    def values(self):
+        return [self[key] for key in self.childIds]
+
+    def items(self):
+        return [(key, self[key]) for key in self.childIds]
+
+class LazyWorldData(object):
+    """
+    This is a memory-mapped world data file. Every object is stored as its
+    own record, so subtrees are only decoded once something walks into them.
+    """
+
+    nextStoreId = 0
+
+    def __init__(self, buffer, baseOffset=0):
+        self.storeId = LazyWorldData.nextStoreId
+        LazyWorldData.nextStoreId += 1
+        self.buffer = buffer
+        self.baseOffset = baseOffset
+
+        magic, version, self.sourceHash, sourceSize, sourceMtime, self.tableOffset, self.recordCount = STORE_HEADER.unpack_from(buffer, baseOffset)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            raise ValueError('Not a world data store')
+        self.sourceStamp = (sourceSize, sourceMtime)
+
+        fields, childKeys, childIds, objectPaths = self.decodeRecord(self.recordCount - 1)
+        primeObjectPaths(fields.get('ObjectIds', {}), objectPaths)
+
+        # The root of the file is never released.
+        self.root = fields
+        self.root['Objects'] = LazyObjectDict(self, childKeys, childIds)
+
+    def decodeRecord(self, recordId):
+        # Each record ends where the next one starts.
+        start, end = STORE_SPAN.unpack_from(self.buffer, self.baseOffset + self.tableOffset + recordId * STORE_TABLE_ENTRY.size)
+        return pickle.loads(self.buffer[self.baseOffset + start:self.baseOffset + end])
+
+    def getRecord(self, recordId):
+        key = (self.storeId, recordId)
+        record = recordCache.get(key)
+        if record is None:
+            record, childKeys, childIds = self.decodeRecord(recordId)
+            if childKeys is not None:
+                record['Objects'] = LazyObjectDict(self, childKeys, childIds)
+            recordCache.add(key, record)
+        return record
+
+    def isCurrent(self, sourcePath):
+        """
+        This checks if the store still matches its source file.
+        """
+
+        return isSourceCurrent(sourcePath, self.sourceHash, self.sourceStamp)
+
+    def release(self):
+        recordCache.discard(self.storeId)
+
+def isLazyWorldData(fileData):
+    """
+    This checks if a file's data is backed by a lazy world data store.
+    """
+
+    return isinstance(fileData.get('Objects'), LazyObjectDict)
+
+def releaseLazyWorldData(fileData):
+    """
+    This releases every decoded record of a lazily loaded file.
+    """
+
+    if isLazyWorldData(fileData):
+        fileData['Objects'].store.release()
+
+def writeLazyWorldData(storeFile, objectStruct, sourceHash=None, sourceStamp=None, withObjectIds=True):
+    """
+    This writes an objectStruct as a lazy world data store at the
+    current position of an open file. Without withObjectIds, the
+    ObjectIds are left out, for stores that keep them elsewhere.
+    """
+
+    baseOffset = storeFile.tell()
+    storeFile.write(b'\0' * STORE_HEADER.size)
+    offsets = []
+
+    def writeRecord(record):
+        offsets.append(storeFile.tell() - baseOffset)
+        pickle.dump(record, storeFile, pickle.HIGHEST_PROTOCOL)
+        return len(offsets) - 1
+
+    def writeObjects(objects):
+        # Children are written before their parent, so the parent's
+        # record can refer to their record ids.
+        childKeys = list(objects.keys())
+        childIds = []
+        for key in childKeys:
+            obj = dict(objects[key])
+            grandChildren = obj.pop('Objects', None)
+            if grandChildren is None:
+                childIds.append(writeRecord((obj, None, None)))
+            else:
+                grandChildKeys, grandChildIds = writeObjects(grandChildren)
+                childIds.append(writeRecord((obj, grandChildKeys, grandChildIds)))
+
+        return childKeys, childIds
+
+    root = dict(objectStruct)
+    if not withObjectIds:
+        root.pop('ObjectIds', None)
+    childKeys, childIds = writeObjects(root.pop('Objects', {}))
+    objectPaths = compileObjectIds(root.get('ObjectIds', {}))
+    writeRecord((root, childKeys, childIds, objectPaths))
+
+    tableOffset = storeFile.tell() - baseOffset
+    offsets.append(tableOffset)
+    for offset in offsets:
+        storeFile.write(STORE_TABLE_ENTRY.pack(offset))
+
+    endOffset = storeFile.tell()
+    storeFile.seek(baseOffset)
+    sourceSize, sourceMtime = sourceStamp or NO_SOURCE_STAMP
+    storeFile.write(STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, sourceHash or NO_SOURCE_HASH, sourceSize, sourceMtime, tableOffset, len(offsets) - 1))
+    storeFile.seek(endOffset)
+
+def getStorePath(directory, moduleName):
+    """
+    This returns the path of a world data module's lazy store file.
+    """
+
+    cachePath = getCachePath(directory, moduleName)
+    if cachePath:
+        return os.path.splitext(cachePath)[0] + STORE_EXTENSION
+
+def compileLazyWorldData(directory, moduleName):
+    """
+    This imports a world data module and writes its lazy store file.
+    """
+
+    objectStruct = importWorldData(directory, moduleName)
+    if objectStruct is None:
+        notify.warning('%s.%s has no objectStruct' % (directory, moduleName))
+        return
+
+    storePath = getStorePath(directory, moduleName)
+    sourcePath = getSourcePath(directory, moduleName)
+    writeLazyWorldDataFile(storePath, objectStruct, hashSource(sourcePath), getSourceStamp(sourcePath))
+    return storePath
+
+def writeLazyWorldDataFile(storePath, objectStruct, sourceHash=None, sourceStamp=None):
+    """
+    This writes an objectStruct to a lazy store file.
+    """
+
+    tempPath = storePath + '.tmp'
+    with open(tempPath, 'wb') as storeFile:
+        writeLazyWorldData(storeFile, objectStruct, sourceHash, sourceStamp)
+
+    if os.path.exists(storePath):
+        os.remove(storePath)
+    os.rename(tempPath, storePath)
+
+def openLazyWorldData(storePath, sourcePath=None):
+    """
+    This memory-maps a lazy store file and returns its root data. None
+    is returned if the store is missing, corrupt or doesn't match the source file.
+    """
+
+    if not storePath or not os.path.exists(storePath):
+        return
+
+    try:
+        with open(storePath, 'rb') as storeFile:
+            buffer = mmap.mmap(storeFile.fileno(), 0, access=mmap.ACCESS_READ)
+        store = LazyWorldData(buffer)
+    except Exception as e:
+        notify.warning('Could not open %s: %s' % (storePath, e))
+        return
+
+    if sourcePath is not None and not store.isCurrent(sourcePath):
+        store.release()
+        return
+
+    return store.root
+
+def loadLazyWorldData(directory, moduleName):
+    """
+    This returns a world data module's lazily loaded data from its store
+    file, or None if there is no up to date store.
+    """
+
+    storePath = getStorePath(directory, moduleName)
+    if not storePath or not os.path.exists(storePath):
+        return
+
+    return openLazyWorldData(storePath, getSourcePath(directory, moduleName))
+
+def compileLazyWorldDataDir(directory):
+    """
+    This writes a lazy store file for every world data module in a world data package.
+    """
+
+    storePaths = []
+    for moduleName in getWorldDataModules(directory):
+        storePath = compileLazyWorldData(directory, moduleName)
+        if storePath:
+            storePaths.append(storePath)
+
+    return storePaths
+
+def main(args=None):
+    """
+    Compiles the lazy store files of a world data package:
+        python -m libpandaworld.WorldDataStore [world-data-dir]
+    """
+
+    if args is None:
+        args = sys.argv[1:]
+
+    directory = args[0] if args else 'worldData'
+    sys.path.insert(0, os.getcwd())
+    for storePath in compileLazyWorldDataDir(directory):
+        print(storePath)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
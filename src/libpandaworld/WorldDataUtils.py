@@ -0,0 +1,205 @@
+import math, re
+
+# Matches a single subscript of an ObjectIds path, such as
+# ["Objects"], ['1150922126.8dzlu'] or [0].
+SUBSCRIPT_RE = re.compile(r'\s*\[\s*(?:"([^"]*)"|\'([^\']*)\'|(-?\d+))\s*\]')
+
+objectPathCache = {}
+
+def parseObjectPath(pathString):
+    """
+    This parses an ObjectIds subscript string into a tuple of keys.
+    Parsed paths are cached, so each string is only parsed once.
+    """
+
+    path = objectPathCache.get(pathString)
+    if path is not None:
+        return path
+
+    keys = []
+    pos = 0
+    end = len(pathString.rstrip())
+    while pos < end:
+        match = SUBSCRIPT_RE.match(pathString, pos)
+        if not match:
+            raise ValueError('Invalid object path: %r' % pathString)
+        doubleQuoted, singleQuoted, index = match.groups()
+        if doubleQuoted is not None:
+            keys.append(doubleQuoted)
+        elif singleQuoted is not None:
+            keys.append(singleQuoted)
+        else:
+            keys.append(int(index))
+        pos = match.end()
+
+    path = tuple(keys)
+    objectPathCache[pathString] = path
+    return path
+
+def compileObjectIds(objectIds):
+    """
+    This parses every path in an ObjectIds table and returns
+    a dictionary of UIDs to key tuples.
+    """
+
+    paths = {}
+    for uid in objectIds:
+        paths[uid] = parseObjectPath(objectIds[uid])
+
+    return paths
+
+def primeObjectPaths(objectIds, paths):
+    """
+    This fills the path cache with already parsed paths, such as
+    the ones stored in a world data cache file.
+    """
+
+    for uid in paths:
+        pathString = objectIds.get(uid)
+        if pathString is not None:
+            objectPathCache[pathString] = tuple(paths[uid])
+
+def forgetObjectIds(objectIds):
+    """
+    This drops the cached paths of an ObjectIds table.
+    """
+
+    for pathString in objectIds.values():
+        objectPathCache.pop(pathString, None)
+
+def resolveObjectPath(data, path):
+    """
+    This walks a key tuple through nested world data and returns
+    the data at the end of the path.
+    """
+
+    for key in path:
+        data = data[key]
+
+    return data
+
+def walkObjects(objects, parentUid=None):
+    """
+    This walks an Objects dictionary depth first, yielding a
+    (uid, objectData, parentUid) tuple for every object in it.
+    """
+
+    stack = [(objects, parentUid)]
+    while stack:
+        objects, parentUid = stack.pop()
+        for uid in objects:
+            obj = objects[uid]
+            yield uid, obj, parentUid
+            children = obj.get('Objects')
+            if children:
+                stack.append((children, uid))
+
+def getFileReferences(objectStruct, rootsOnly=False):
+    """
+    This returns the names of every world data module referenced by
+    a File or AdditionalData entry in an objectStruct, or only by
+    its root objects if rootsOnly is set.
+    """
+
+    if rootsOnly:
+        objects = list(objectStruct.get('Objects', {}).values())
+    else:
+        objects = [obj for uid, obj, parentUid in walkObjects(objectStruct.get('Objects', {}))]
+
+    references = set()
+    for obj in objects:
+        childFilename = obj.get('File')
+        if childFilename:
+            references.add(childFilename)
+        for additionalFile in obj.get('AdditionalData', []):
+            references.add(additionalFile)
+
+    return references
+
+def getObjectPos(obj, offset=None):
+    """
+    This returns an object's Pos as an (x, y, z) tuple, added to the
+    passed offset. Parent rotation and scale are not taken into account,
+    so this is only close for objects below rotated or scaled parents.
+    Use getObjectTransform where that matters.
+    """
+
+    pos = obj.get('Pos')
+    if offset is None:
+        offset = (0.0, 0.0, 0.0)
+    if pos is None:
+        return offset
+
+    return (offset[0] + pos[0], offset[1] + pos[1], offset[2] + pos[2])
+
+def getObjectTransform(obj, parentTransform=None):
+    """
+    This returns an object's transform, composed with its parent's, as an
+    (origin, axes) tuple. The axes are where the object's x, y and z unit
+    vectors end up, so a point p of the object is at origin + p[0] * axes[0]
+    + p[1] * axes[1] + p[2] * axes[2]. Like Panda, the object is scaled,
+    then rolled, pitched and turned to its heading, then moved to its Pos.
+    """
+
+    pos = obj.get('Pos') or (0.0, 0.0, 0.0)
+    hpr = obj.get('Hpr')
+    scale = obj.get('Scale')
+    if isinstance(scale, (int, float)):
+        scale = (scale, scale, scale)
+
+    axes = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    if scale is not None:
+        for i in range(3):
+            axes[i][i] = float(scale[i])
+    if hpr is not None and (hpr[0] or hpr[1] or hpr[2]):
+        axes = [rotateVector(axis, hpr) for axis in axes]
+
+    if parentTransform is None:
+        return (tuple([float(value) for value in pos]), tuple([tuple(axis) for axis in axes]))
+
+    return (transformPoint(parentTransform, pos), tuple([transformVector(parentTransform, axis) for axis in axes]))
+
+def rotateVector(vector, hpr):
+    """
+    This rotates a vector by a heading, pitch and roll in degrees,
+    applying the roll first and the heading last.
+    """
+
+    h, p, r = [math.radians(angle) for angle in hpr]
+    x, y, z = vector
+    x, z = x * math.cos(r) + z * math.sin(r), z * math.cos(r) - x * math.sin(r)
+    y, z = y * math.cos(p) - z * math.sin(p), y * math.sin(p) + z * math.cos(p)
+    x, y = x * math.cos(h) - y * math.sin(h), x * math.sin(h) + y * math.cos(h)
+    return [x, y, z]
+
+def transformVector(transform, vector):
+    axes = transform[1]
+    return tuple([vector[0] * axes[0][i] + vector[1] * axes[1][i] + vector[2] * axes[2][i] for i in range(3)])
+
+def transformPoint(transform, point):
+    """
+    This returns where a point of an object is relative to
+    the space its transform (see getObjectTransform) is in.
+    """
+
+    offset = transformVector(transform, point)
+    origin = transform[0]
+    return (origin[0] + offset[0], origin[1] + offset[1], origin[2] + offset[2])
+
+def getModelNames(obj):
+    """
+    This returns the model names of an object's Visual. The Model
+    may be a single name or a list of names.
+    """
+
+    visual = obj.get('Visual')
+    if not visual:
+        return []
+
+    model = visual.get('Model')
+    if not model:
+        return []
+    if isinstance(model, (list, tuple)):
+        return list(model)
+
+    return [model]
\ No newline at end of file
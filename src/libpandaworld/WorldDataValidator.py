@@ -0,0 +1,391 @@
+from libpandaworld.WorldDataUtils import parseObjectPath, resolveObjectPath, walkObjects
+from libpandaworld.WorldDataCache import getCachePath, getSourcePath, getSourceStamp, getWorldDataModules, getWorldDataPath, hashSource, importWorldData, writeWorldDataCache
+from libpandaworld.WorldDataStore import getStorePath, writeLazyWorldDataFile
+from libpandaworld.WorldDataSharedStore import getSharedStorePath, writeSharedWorldDataFile
+import os, sys, json, time, argparse
+
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+class StubConfig(object):
+    """
+    This stands in for Panda3D's config when world data is validated
+    without a running game, returning the passed values or the defaults.
+    """
+
+    def __init__(self, values=None):
+        self.values = values or {}
+
+    def getValue(self, name, default):
+        return self.values.get(name, default)
+
+    GetString = GetBool = GetInt = GetFloat = getValue
+
+def installStubConfig(values=None):
+    """
+    This installs a StubConfig as the builtin config,
+    unless a config is already installed.
+    """
+
+    if not hasattr(builtins, 'config'):
+        builtins.config = StubConfig(values)
+
+class WorldDataValidator(object):
+    """
+    This loads every module in a world data package and checks it the way
+    the world creators would use it, without creating any objects:
+
+        - Every ObjectIds path parses and leads to the object it names.
+        - Every object in the Objects tree has an ObjectIds entry.
+        - No UID is defined twice, in one file or across files.
+        - Every File and AdditionalData reference names a module.
+        - No file references itself, directly or through other files.
+
+    It also counts the objects of each file, and estimates what loading
+    each file costs from everything it references.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.objectStructs = {}
+        self.sourceHashes = {}
+        self.sourceStamps = {}
+        self.openTimes = {}
+        self.objectCounts = {}
+        self.typeCounts = {}
+        self.references = {}
+        self.uidFiles = {}
+        self.errors = []
+        self.warnings = []
+
+    def error(self, moduleName, message):
+        self.errors.append((moduleName, message))
+
+    def warning(self, moduleName, message):
+        self.warnings.append((moduleName, message))
+
+    def loadModules(self):
+        """
+        This imports every module in the world data package.
+        """
+
+        if not getWorldDataPath(self.directory):
+            self.error(None, '%s is not a world data package' % self.directory)
+            return
+
+        for moduleName in getWorldDataModules(self.directory):
+            startTime = time.time()
+            try:
+                objectStruct = importWorldData(self.directory, moduleName)
+            except Exception as e:
+                self.error(moduleName, 'Got a %s when importing: %s' % (e.__class__.__name__, e))
+                continue
+            self.openTimes[moduleName] = time.time() - startTime
+
+            if objectStruct is None:
+                self.error(moduleName, 'Has no objectStruct')
+                continue
+
+            self.objectStructs[moduleName] = objectStruct
+            sourcePath = getSourcePath(self.directory, moduleName)
+            self.sourceStamps[moduleName] = getSourceStamp(sourcePath)
+            self.sourceHashes[moduleName] = hashSource(sourcePath)
+
+    def validate(self):
+        """
+        This runs every check, and returns True if no errors were found.
+        """
+
+        if not self.objectStructs:
+            self.loadModules()
+
+        for moduleName in sorted(self.objectStructs):
+            self.checkObjects(moduleName, self.objectStructs[moduleName])
+            self.checkObjectIds(moduleName, self.objectStructs[moduleName])
+
+        self.checkDuplicateUids()
+        self.checkReferences()
+        self.checkCycles()
+        return not self.errors
+
+    def checkObjects(self, moduleName, objectStruct):
+        objectIds = objectStruct.get('ObjectIds', {})
+        uidCounts = {}
+        typeCounts = {}
+        references = []
+        for uid, obj, parentUid in walkObjects(objectStruct.get('Objects', {})):
+            uidCounts[uid] = uidCounts.get(uid, 0) + 1
+            objType = obj.get('Type')
+            typeCounts[str(objType)] = typeCounts.get(str(objType), 0) + 1
+            self.uidFiles.setdefault(uid, []).append((moduleName, obj))
+            if uid not in objectIds:
+                self.warning(moduleName, '%s (%s) has no ObjectIds entry' % (uid, objType))
+
+            childFilename = obj.get('File')
+            if childFilename:
+                references.append((uid, 'File', childFilename))
+            for additionalFile in obj.get('AdditionalData', []):
+                references.append((uid, 'AdditionalData', additionalFile))
+
+        for uid in sorted(uidCounts):
+            if uidCounts[uid] > 1:
+                self.error(moduleName, '%s is defined %d times' % (uid, uidCounts[uid]))
+
+        self.objectCounts[moduleName] = sum(uidCounts.values())
+        self.typeCounts[moduleName] = typeCounts
+        self.references[moduleName] = references
+
+    def checkObjectIds(self, moduleName, objectStruct):
+        objectIds = objectStruct.get('ObjectIds', {})
+        for uid in sorted(objectIds):
+            try:
+                path = parseObjectPath(objectIds[uid])
+            except ValueError as e:
+                self.error(moduleName, 'ObjectIds path of %s: %s' % (uid, e))
+                continue
+
+            try:
+                obj = resolveObjectPath(objectStruct, path)
+            except (KeyError, IndexError, TypeError):
+                self.error(moduleName, 'ObjectIds path of %s is stale: %s' % (uid, objectIds[uid]))
+                continue
+
+            if not isinstance(obj, Mapping):
+                self.error(moduleName, 'ObjectIds path of %s leads to a %s' % (uid, obj.__class__.__name__))
+            elif not path or path[-1] != uid:
+                self.error(moduleName, 'ObjectIds path of %s leads to %s' % (uid, path[-1] if path else 'the file'))
+
+    def checkDuplicateUids(self):
+        """
+        A UID may be defined in more than one file when one of them is a
+        stub that loads the other file, or when a file is loaded as the
+        AdditionalData of the object.
+        """
+
+        for uid in sorted(self.uidFiles):
+            entries = self.uidFiles[uid]
+            moduleNames = set([moduleName for moduleName, obj in entries])
+            if len(moduleNames) < 2:
+                continue
+
+            linked = set()
+            for moduleName, obj in entries:
+                childFilename = obj.get('File')
+                if childFilename in moduleNames:
+                    linked.update([moduleName, childFilename])
+                for additionalFile in obj.get('AdditionalData', []):
+                    if additionalFile in moduleNames:
+                        linked.update([moduleName, additionalFile])
+
+            if moduleNames - linked:
+                self.error(None, '%s is defined in %s' % (uid, ', '.join(sorted(moduleNames))))
+
+    def checkReferences(self):
+        for moduleName in sorted(self.references):
+            for uid, kind, reference in self.references[moduleName]:
+                if reference == moduleName:
+                    self.error(moduleName, '%s %s references its own file' % (uid, kind))
+                elif reference not in self.objectStructs:
+                    self.error(moduleName, '%s %s references missing module %s' % (uid, kind, reference))
+
+    def getReferencedModules(self, moduleName):
+        references = []
+        for uid, kind, reference in self.references.get(moduleName, []):
+            if reference in self.objectStructs and reference not in references:
+                references.append(reference)
+        return references
+
+    def checkCycles(self):
+        """
+        This reports every reference cycle between files, each once.
+        """
+
+        visited = set()
+        reported = set()
+        for rootModule in sorted(self.references):
+            if rootModule in visited:
+                continue
+
+            path = [rootModule]
+            onPath = set(path)
+            stack = [iter(self.getReferencedModules(rootModule))]
+            visited.add(rootModule)
+            while stack:
+                reference = next(stack[-1], None)
+                if reference is None:
+                    stack.pop()
+                    onPath.discard(path.pop())
+                    continue
+
+                if reference in onPath:
+                    cycle = path[path.index(reference):]
+                    key = frozenset(cycle)
+                    if len(cycle) > 1 and key not in reported:
+                        reported.add(key)
+                        self.error(reference, 'Reference cycle: %s' % ' -> '.join(cycle + [reference]))
+                    continue
+
+                if reference in visited:
+                    continue
+
+                visited.add(reference)
+                path.append(reference)
+                onPath.add(reference)
+                stack.append(iter(self.getReferencedModules(reference)))
+
+    def getLoadedModules(self, moduleName):
+        """
+        This returns every module loaded along with a module,
+        following its File and AdditionalData references.
+        """
+
+        loaded = [moduleName]
+        seen = set(loaded)
+        index = 0
+        while index < len(loaded):
+            for reference in self.getReferencedModules(loaded[index]):
+                if reference not in seen:
+                    seen.add(reference)
+                    loaded.append(reference)
+            index += 1
+
+        return loaded
+
+    def getFileReport(self, moduleName):
+        """
+        This returns the counts of a file, along with an estimate of its
+        load cost: every object and file loaded along with it, and how
+        long those files took to import.
+        """
+
+        loaded = self.getLoadedModules(moduleName)
+        return {
+            'objects': self.objectCounts.get(moduleName, 0),
+            'objectIds': len(self.objectStructs[moduleName].get('ObjectIds', {})),
+            'types': self.typeCounts.get(moduleName, {}),
+            'references': len(self.references.get(moduleName, [])),
+            'importTime': self.openTimes.get(moduleName, 0.0),
+            'loadCost': {
+                'files': len(loaded),
+                'objects': sum([self.objectCounts.get(name, 0) for name in loaded]),
+                'importTime': sum([self.openTimes.get(name, 0.0) for name in loaded])}}
+
+    def getReport(self):
+        """
+        This returns the results as a JSON serializable dictionary.
+        """
+
+        return {
+            'directory': self.directory,
+            'files': dict([(moduleName, self.getFileReport(moduleName)) for moduleName in self.objectStructs]),
+            'errors': [{'file': moduleName, 'message': message} for moduleName, message in self.errors],
+            'warnings': [{'file': moduleName, 'message': message} for moduleName, message in self.warnings]}
+
+    def formatReport(self):
+        lines = []
+        lines.append('%-32s %8s %8s %6s %10s %10s' % ('File', 'Objects', 'Refs', 'Files', 'Load objs', 'Import ms'))
+        for moduleName in sorted(self.objectStructs):
+            report = self.getFileReport(moduleName)
+            loadCost = report['loadCost']
+            lines.append('%-32s %8d %8d %6d %10d %10.1f' % (moduleName, report['objects'], report['references'], loadCost['files'], loadCost['objects'], loadCost['importTime'] * 1000.0))
+
+        for moduleName, message in self.errors:
+            lines.append('ERROR %s: %s' % (moduleName or self.directory, message))
+        for moduleName, message in self.warnings:
+            lines.append('WARNING %s: %s' % (moduleName or self.directory, message))
+
+        lines.append('%d files, %d errors, %d warnings' % (len(self.objectStructs), len(self.errors), len(self.warnings)))
+        return '\n'.join(lines)
+
+    def writeCaches(self):
+        """
+        This writes the cache file (see WorldDataCache) of every module.
+        """
+
+        paths = []
+        for moduleName in sorted(self.objectStructs):
+            cachePath = getCachePath(self.directory, moduleName)
+            writeWorldDataCache(cachePath, self.objectStructs[moduleName], self.sourceHashes[moduleName], self.sourceStamps[moduleName])
+            paths.append(cachePath)
+
+        return paths
+
+    def writeLazyStores(self):
+        """
+        This writes the lazy store file (see WorldDataStore) of every module.
+        """
+
+        paths = []
+        for moduleName in sorted(self.objectStructs):
+            storePath = getStorePath(self.directory, moduleName)
+            writeLazyWorldDataFile(storePath, self.objectStructs[moduleName], self.sourceHashes[moduleName], self.sourceStamps[moduleName])
+            paths.append(storePath)
+
+        return paths
+
+    def writeSharedStore(self, storePath=None):
+        """
+        This writes every module to a shared store file (see WorldDataSharedStore).
+        """
+
+        if storePath is None:
+            storePath = getSharedStorePath(self.directory)
+
+        objectStructs = [(moduleName, self.objectStructs[moduleName], self.sourceHashes[moduleName], self.sourceStamps[moduleName]) for moduleName in self.objectStructs]
+        writeSharedWorldDataFile(storePath, objectStructs)
+        return storePath
+
+def main(args=None):
+    """
+    Validates a world data package, and optionally writes its
+    cache and store files in the same pass:
+        python -m libpandaworld.WorldDataValidator [world-data-dir] [options]
+    """
+
+    parser = argparse.ArgumentParser(description='Validate a world data package.')
+    parser.add_argument('directory', nargs='?', default='worldData', help='world data package')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--strict', action='store_true', help='treat warnings as errors')
+    parser.add_argument('--write-caches', action='store_true', help='write the cache file of every module')
+    parser.add_argument('--write-stores', action='store_true', help='write the lazy store file of every module')
+    parser.add_argument('--write-shared-store', nargs='?', const='', default=None, metavar='FILE', help='write a shared store file')
+    parser.add_argument('--force', action='store_true', help='write files even if there are errors')
+    options = parser.parse_args(args)
+
+    sys.path.insert(0, os.getcwd())
+    installStubConfig({'world-data-dir': options.directory})
+
+    validator = WorldDataValidator(options.directory)
+    valid = validator.validate()
+    if options.strict and validator.warnings:
+        valid = False
+
+    paths = []
+    if valid or options.force:
+        if options.write_caches:
+            paths.extend(validator.writeCaches())
+        if options.write_stores:
+            paths.extend(validator.writeLazyStores())
+        if options.write_shared_store is not None:
+            paths.append(validator.writeSharedStore(options.write_shared_store or None))
+
+    if options.json:
+        report = validator.getReport()
+        report['written'] = paths
+        print(json.dumps(report, indent=4, sort_keys=True))
+    else:
+        print(validator.formatReport())
+        for path in paths:
+            print(path)
+
+    return 0 if valid else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,104 @@
+from pandac.PandaModules import PStatCollector
+import json
+
+class WorldLoadProfiler(object):
+    """
+    This records how long each phase of world loading takes, with
+    counts and timings broken down per file and per object type.
+    """
+
+    def __init__(self, wantPStats=False):
+        self.wantPStats = wantPStats
+        self.collectors = {}
+        self.reset()
+
+    def reset(self):
+        self.phases = {}
+        self.files = {}
+        self.objectTypes = {}
+        self.callbacks = {}
+        self.startTime = globalClock.getRealTime()
+
+    def getCollector(self, phase):
+        collector = self.collectors.get(phase)
+        if collector is None:
+            collector = PStatCollector('World:%s' % phase)
+            self.collectors[phase] = collector
+        return collector
+
+    def start(self, phase):
+        """
+        This starts timing a phase and returns its start time, which
+        is passed back to stop.
+        """
+
+        if self.wantPStats:
+            self.getCollector(phase).start()
+        return globalClock.getRealTime()
+
+    def stop(self, phase, startTime, fileName=None, objType=None):
+        """
+        This stops timing a phase and records it.
+        """
+
+        if self.wantPStats:
+            self.getCollector(phase).stop()
+        self.record(phase, globalClock.getRealTime() - startTime, fileName, objType)
+
+    def record(self, phase, elapsed, fileName=None, objType=None):
+        """
+        This records a single timing of a phase.
+        """
+
+        self.addTiming(self.phases, phase, elapsed)
+        if fileName:
+            if fileName.endswith('.py'):
+                fileName = fileName[:-3]
+            self.addTiming(self.files.setdefault(fileName, {}), phase, elapsed)
+        if objType:
+            self.addTiming(self.objectTypes.setdefault(objType, {}), phase, elapsed)
+
+    def recordCallback(self, name, elapsed):
+        """
+        This records a single call of a post load callback.
+        """
+
+        self.addTiming(self.callbacks, name, elapsed)
+
+    def addTiming(self, timings, key, elapsed):
+        timing = timings.get(key)
+        if timing is None:
+            timings[key] = [1, elapsed]
+        else:
+            timing[0] += 1
+            timing[1] += elapsed
+
+    def formatTimings(self, timings):
+        report = {}
+        for key, (count, elapsed) in timings.items():
+            report[key] = {'count': count, 'time': elapsed}
+        return report
+
+    def getReport(self):
+        """
+        This returns everything recorded since the last reset
+        as a JSON serializable dictionary.
+        """
+
+        return {
+            'totalTime': globalClock.getRealTime() - self.startTime,
+            'phases': self.formatTimings(self.phases),
+            'files': dict([(name, self.formatTimings(timings)) for name, timings in self.files.items()]),
+            'objectTypes': dict([(name, self.formatTimings(timings)) for name, timings in self.objectTypes.items()]),
+            'callbacks': self.formatTimings(self.callbacks)}
+
+    def getReportJson(self):
+        return json.dumps(self.getReport(), indent=4, sort_keys=True)
+
+    def writeReport(self, filename):
+        """
+        This writes the report to a JSON file.
+        """
+
+        with open(filename, 'w') as reportFile:
+            reportFile.write(self.getReportJson())
\ No newline at end of file
@@ -0,0 +1,76 @@
+from libpandaworld.WorldDataUtils import getObjectPos
+import heapq
+
+class WorldObjectStream(object):
+    """
+    This is a priority queue of world objects waiting to be created.
+    Objects are ordered by zone level, then by the priority of their
+    type, then by their distance from the focus position.
+    """
+
+    DefaultTypePriority = 10
+
+    def __init__(self, focusPos=None, typePriorities=None):
+        self.focusPos = focusPos
+        self.typePriorities = typePriorities or {}
+        self.entries = []
+        self.counter = 0
+        self.taskName = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def getDistance(self, pos):
+        if self.focusPos is None:
+            return 0.0
+
+        dx = pos[0] - self.focusPos[0]
+        dy = pos[1] - self.focusPos[1]
+        dz = pos[2] - self.focusPos[2]
+        return dx * dx + dy * dy + dz * dz
+
+    def getPriority(self, obj, zoneLevel, pos):
+        typePriority = self.typePriorities.get(obj.get('Type'), self.DefaultTypePriority)
+        return (zoneLevel, typePriority, self.getDistance(pos))
+
+    def push(self, obj, objKey, parent, parentUid, zoneLevel=0, offset=None, fileName=None, actualParentObj=None):
+        """
+        This queues an object. Its position is its Pos added to the
+        offset of its parent.
+        """
+
+        pos = getObjectPos(obj, offset)
+        entry = (obj, objKey, parent, parentUid, zoneLevel, pos, fileName, actualParentObj)
+        # The counter keeps objects of equal priority in the order they were queued.
+        self.counter += 1
+        heapq.heappush(self.entries, (self.getPriority(obj, zoneLevel, pos), self.counter, entry))
+
+    def pushObjects(self, objDict, parent, parentUid, zoneLevel=0, offset=None, fileName=None, actualParentObj=None):
+        """
+        This queues every object in an object dict.
+        """
+
+        for objKey in objDict.keys():
+            self.push(objDict[objKey], objKey, parent, parentUid, zoneLevel, offset, fileName, actualParentObj)
+
+    def pop(self):
+        """
+        This removes and returns the most important object as an
+        (obj, objKey, parent, parentUid, zoneLevel, pos, fileName, actualParentObj) tuple.
+        """
+
+        return heapq.heappop(self.entries)[2]
+
+    def setFocus(self, focusPos):
+        """
+        This moves the focus position and reorders every queued object.
+        """
+
+        self.focusPos = focusPos
+        entries = []
+        for priority, counter, entry in self.entries:
+            obj, objKey, parent, parentUid, zoneLevel, pos = entry[:6]
+            entries.append((self.getPriority(obj, zoneLevel, pos), counter, entry))
+
+        heapq.heapify(entries)
+        self.entries = entries
\ No newline at end of file
@@ -0,0 +1,356 @@
+from pandac.PandaModules import Point3, VBase3
+from array import array
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+try:
+    intern
+except NameError:
+    from sys import intern
+
+# Each transform is stored as three floats in the transform column, at
+# (index * TRANSFORM_STRIDE) + (slot * 3).
+TRANSFORM_SLOTS = {'Pos': 0, 'Hpr': 1, 'Scale': 2}
+TRANSFORM_TYPES = {'Pos': Point3, 'Hpr': VBase3, 'Scale': VBase3}
+TRANSFORM_STRIDE = 9
+
+HAS_OBJECTS = 1 << 3
+HAS_MODEL = 1 << 4
+
+MISSING = object()
+
+class WorldObjectTable(object):
+    """
+    This stores the objects of a world data file in columns instead of
+    nested dicts. Types, file names, names and Visual models are interned,
+    transforms are packed into a float array, and the children of each
+    object are a contiguous range of rows. Only the other fields of an
+    object are kept in a dict of their own. Objects are read through
+    WorldObjectView and WorldObjectMap, which behave like the original
+    read-only dicts.
+    """
+
+    def __init__(self, objects):
+        self.uids = []
+        self.rows = {}
+        self.types = [None]
+        self.typeIds = {None: 0}
+        self.typeColumn = array('H')
+        self.fileColumn = array('i')
+        self.files = []
+        self.fileIds = {}
+        self.strings = []
+        self.stringIds = {}
+        self.nameColumn = array('i')
+        self.modelColumn = array('i')
+        self.parentColumn = array('i')
+        self.childStartColumn = array('i')
+        self.childCountColumn = array('i')
+        self.flagColumn = array('B')
+        self.transformColumn = array('f')
+        self.extras = {}
+
+        # Objects are laid out breadth first, so the children of
+        # every object end up next to each other.
+        rootKeys = list(objects.keys())
+        queue = [(key, objects[key], -1) for key in rootKeys]
+        self.rootCount = len(rootKeys)
+        row = 0
+        while row < len(queue):
+            uid, obj, parentRow = queue[row]
+            children = obj.get('Objects')
+            childStart = len(queue)
+            if children:
+                for childKey in children.keys():
+                    queue.append((childKey, children[childKey], row))
+            self.addRow(uid, obj, parentRow, childStart, len(queue) - childStart)
+            row += 1
+
+    def internId(self, value, values, valueIds):
+        valueId = valueIds.get(value)
+        if valueId is None:
+            valueId = len(values)
+            values.append(intern(value) if isinstance(value, str) else value)
+            valueIds[value] = valueId
+        return valueId
+
+    def addRow(self, uid, obj, parentRow, childStart, childCount):
+        row = len(self.uids)
+        self.uids.append(uid)
+        self.rows[uid] = row
+        self.parentColumn.append(parentRow)
+        self.childStartColumn.append(childStart)
+        self.childCountColumn.append(childCount)
+
+        flags = 0
+        extra = {}
+        transform = [0.0] * TRANSFORM_STRIDE
+        for key in obj:
+            value = obj[key]
+            if key == 'Type':
+                continue
+            elif key == 'Objects':
+                flags |= HAS_OBJECTS
+            elif key in ('File', 'Name') and isinstance(value, str):
+                continue
+            elif key == 'Visual' and self.isModelVisual(value):
+                flags |= HAS_MODEL
+            elif key in TRANSFORM_SLOTS and self.isVector(value):
+                slot = TRANSFORM_SLOTS[key]
+                flags |= 1 << slot
+                transform[slot * 3:slot * 3 + 3] = [float(value[0]), float(value[1]), float(value[2])]
+            else:
+                extra[key] = value
+
+        self.typeColumn.append(self.internId(obj.get('Type'), self.types, self.typeIds))
+        if isinstance(obj.get('File'), str):
+            self.fileColumn.append(self.internId(obj['File'], self.files, self.fileIds))
+        else:
+            self.fileColumn.append(-1)
+        self.nameColumn.append(self.internString(obj.get('Name')))
+        if flags & HAS_MODEL:
+            self.modelColumn.append(self.internString(obj['Visual']['Model']))
+        else:
+            self.modelColumn.append(-1)
+        self.flagColumn.append(flags)
+        self.transformColumn.extend(transform)
+        if extra:
+            self.extras[row] = extra
+
+    def internString(self, value):
+        if not isinstance(value, str):
+            return -1
+        return self.internId(value, self.strings, self.stringIds)
+
+    def isModelVisual(self, value):
+        # Most Visuals only name a single model.
+        return isinstance(value, dict) and len(value) == 1 and isinstance(value.get('Model'), str)
+
+    def isVector(self, value):
+        try:
+            return len(value) == 3 and all([isinstance(component, (int, float)) for component in value])
+        except TypeError:
+            return False
+
+    def getField(self, row, key, default=None):
+        """
+        This returns a field of an object as it appeared in the
+        original object data.
+        """
+
+        if key == 'Type':
+            objType = self.types[self.typeColumn[row]]
+            if objType is None:
+                return default
+            return objType
+        elif key == 'File' and self.fileColumn[row] >= 0:
+            return self.files[self.fileColumn[row]]
+        elif key == 'Name' and self.nameColumn[row] >= 0:
+            return self.strings[self.nameColumn[row]]
+        elif key == 'Visual' and self.flagColumn[row] & HAS_MODEL:
+            return {'Model': self.strings[self.modelColumn[row]]}
+        elif key == 'Objects':
+            if not self.flagColumn[row] & HAS_OBJECTS:
+                return default
+            return WorldObjectMap(self, self.childStartColumn[row], self.childCountColumn[row])
+        elif key in TRANSFORM_SLOTS:
+            slot = TRANSFORM_SLOTS[key]
+            if self.flagColumn[row] & (1 << slot):
+                start = row * TRANSFORM_STRIDE + slot * 3
+                return TRANSFORM_TYPES[key](*self.transformColumn[start:start + 3])
+
+        extra = self.extras.get(row)
+        if extra is None:
+            return default
+        return extra.get(key, default)
+
+    def getFieldKeys(self, row):
+        keys = []
+        if self.typeColumn[row]:
+            keys.append('Type')
+        if self.fileColumn[row] >= 0:
+            keys.append('File')
+        if self.nameColumn[row] >= 0:
+            keys.append('Name')
+        flags = self.flagColumn[row]
+        if flags & HAS_MODEL:
+            keys.append('Visual')
+        for key in TRANSFORM_SLOTS:
+            if flags & (1 << TRANSFORM_SLOTS[key]):
+                keys.append(key)
+        if flags & HAS_OBJECTS:
+            keys.append('Objects')
+        keys.extend(self.extras.get(row, {}).keys())
+        return keys
+
+    def getView(self, row):
+        return WorldObjectView(self, row)
+
+    def getRoots(self):
+        return WorldObjectMap(self, 0, self.rootCount)
+
+    def getObjectCount(self):
+        return len(self.uids)
+
+    def getPos(self, uid):
+        """
+        This returns an object's Pos as an (x, y, z) tuple, or None.
+        """
+
+        row = self.rows.get(uid)
+        if row is None or not self.flagColumn[row] & 1:
+            return None
+        start = row * TRANSFORM_STRIDE
+        return tuple(self.transformColumn[start:start + 3])
+
+    def getObjectsByType(self, objType, underUid=None):
+        """
+        This returns the UIDs of every object of a type, optionally only
+        the ones below (and including) the object with the passed UID.
+        """
+
+        typeId = self.typeIds.get(objType)
+        if typeId is None:
+            return []
+
+        if underUid is None:
+            typeColumn = self.typeColumn
+            return [self.uids[row] for row in range(len(self.uids)) if typeColumn[row] == typeId]
+
+        row = self.rows.get(underUid)
+        if row is None:
+            return []
+
+        uids = []
+        ranges = [(row, 1)]
+        while ranges:
+            start, count = ranges.pop()
+            for row in range(start, start + count):
+                if self.typeColumn[row] == typeId:
+                    uids.append(self.uids[row])
+                if self.childCountColumn[row]:
+                    ranges.append((self.childStartColumn[row], self.childCountColumn[row]))
+
+        return uids
+
+class WorldObjectView(object):
+    """
+    This is a read-only view of a single object in a WorldObjectTable.
+    It doesn't inherit from Mapping, since on Python 2 that would give
+    every view a __dict__.
+    """
+
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, key):
+        value = self.table.getField(self.row, key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        return self.table.getField(self.row, key, default)
+
+    def __contains__(self, key):
+        return self.table.getField(self.row, key, MISSING) is not MISSING
+
+    def __iter__(self):
+        return iter(self.table.getFieldKeys(self.row))
+
+    def __len__(self):
+        return len(self.table.getFieldKeys(self.row))
+
+    def __eq__(self, other):
+        if isinstance(other, WorldObjectView):
+            return self.table is other.table and self.row == other.row
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def keys(self):
+        return self.table.getFieldKeys(self.row)
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+class WorldObjectMap(object):
+    """
+    This is a read-only view of an Objects dict in a WorldObjectTable,
+    which is a contiguous range of rows.
+    """
+
+    __slots__ = ('table', 'start', 'count')
+
+    def __init__(self, table, start, count):
+        self.table = table
+        self.start = start
+        self.count = count
+
+    def getRow(self, key):
+        row = self.table.rows.get(key)
+        if row is None or not self.start <= row < self.start + self.count:
+            return None
+        return row
+
+    def __getitem__(self, key):
+        row = self.getRow(key)
+        if row is None:
+            raise KeyError(key)
+        return WorldObjectView(self.table, row)
+
+    def __contains__(self, key):
+        return self.getRow(key) is not None
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self.count
+
+    def keys(self):
+        return self.table.uids[self.start:self.start + self.count]
+
+    def values(self):
+        return [WorldObjectView(self.table, row) for row in range(self.start, self.start + self.count)]
+
+    def items(self):
+        return [(self.table.uids[row], WorldObjectView(self.table, row)) for row in range(self.start, self.start + self.count)]
+
+Mapping.register(WorldObjectView)
+Mapping.register(WorldObjectMap)
+
+def makeColumnarWorldData(objectStruct):
+    """
+    This returns a copy of an objectStruct whose Objects are stored
+    in a WorldObjectTable.
+    """
+
+    fileData = dict(objectStruct)
+    table = WorldObjectTable(objectStruct.get('Objects', {}))
+    fileData['Objects'] = table.getRoots()
+    return fileData
+
+def getObjectTable(fileData):
+    """
+    This returns the WorldObjectTable of a file's data, or
+    None if the file isn't stored in columns.
+    """
+
+    objects = fileData.get('Objects')
+    if isinstance(objects, WorldObjectMap):
+        return objects.table
\ No newline at end of file
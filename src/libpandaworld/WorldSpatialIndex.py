@@ -0,0 +1,163 @@
+import heapq, math
+
+class WorldSpatialIndex(object):
+    """
+    This is a uniform grid of object positions, used for proximity
+    queries. Cells are square on the X and Y axes, while distances
+    are measured in all three.
+    """
+
+    def __init__(self, cellSize=100.0):
+        self.cellSize = float(cellSize)
+        self.cells = {}
+        self.positions = {}
+        self.types = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, uid):
+        return uid in self.positions
+
+    def getCell(self, pos):
+        return (int(math.floor(pos[0] / self.cellSize)), int(math.floor(pos[1] / self.cellSize)))
+
+    def add(self, uid, pos, objType=None):
+        """
+        This adds an object to the index, or moves it if it
+        is already in the index.
+        """
+
+        if uid in self.positions:
+            self.remove(uid)
+
+        pos = (float(pos[0]), float(pos[1]), float(pos[2]))
+        self.positions[uid] = pos
+        self.types[uid] = objType
+        self.cells.setdefault(self.getCell(pos), set()).add(uid)
+
+    def remove(self, uid):
+        """
+        This removes an object from the index.
+        """
+
+        pos = self.positions.pop(uid, None)
+        if pos is None:
+            return
+
+        del self.types[uid]
+        cell = self.getCell(pos)
+        uids = self.cells[cell]
+        uids.discard(uid)
+        if not uids:
+            del self.cells[cell]
+
+    def getPos(self, uid):
+        return self.positions.get(uid)
+
+    def getDistanceSquared(self, uid, pos):
+        objPos = self.positions[uid]
+        return (objPos[0] - pos[0]) ** 2 + (objPos[1] - pos[1]) ** 2 + (objPos[2] - pos[2]) ** 2
+
+    def getCellRange(self, minPos, maxPos):
+        minCell = self.getCell(minPos)
+        maxCell = self.getCell(maxPos)
+        for cellX in range(minCell[0], maxCell[0] + 1):
+            for cellY in range(minCell[1], maxCell[1] + 1):
+                uids = self.cells.get((cellX, cellY))
+                if uids:
+                    for uid in uids:
+                        yield uid
+
+    def getObjectsInRadius(self, pos, radius, objType=None):
+        """
+        This returns the UIDs of every object within a radius of a
+        position, nearest first, optionally only of the passed type.
+        """
+
+        radiusSquared = radius * radius
+        found = []
+        for uid in self.getCellRange((pos[0] - radius, pos[1] - radius), (pos[0] + radius, pos[1] + radius)):
+            if objType is not None and self.types[uid] != objType:
+                continue
+            distanceSquared = self.getDistanceSquared(uid, pos)
+            if distanceSquared <= radiusSquared:
+                found.append((distanceSquared, uid))
+
+        found.sort()
+        return [uid for distanceSquared, uid in found]
+
+    def getObjectsInBox(self, minPos, maxPos, objType=None):
+        """
+        This returns the UIDs of every object inside a box,
+        optionally only of the passed type.
+        """
+
+        found = []
+        for uid in self.getCellRange(minPos, maxPos):
+            if objType is not None and self.types[uid] != objType:
+                continue
+            objPos = self.positions[uid]
+            if minPos[0] <= objPos[0] <= maxPos[0] and minPos[1] <= objPos[1] <= maxPos[1] and minPos[2] <= objPos[2] <= maxPos[2]:
+                found.append(uid)
+
+        return found
+
+    def getNearestObjects(self, pos, count=1, objType=None, maxRadius=None):
+        """
+        This returns the UIDs of the nearest objects to a position, nearest
+        first, optionally only of the passed type or within a radius.
+
+        Cells are searched in rings around the position, stopping once the
+        next ring can't hold anything nearer than what was already found.
+        """
+
+        if not self.cells or count <= 0:
+            return []
+
+        cellXs = [cell[0] for cell in self.cells]
+        cellYs = [cell[1] for cell in self.cells]
+        centerX, centerY = self.getCell(pos)
+        maxRing = max(centerX - min(cellXs), max(cellXs) - centerX, centerY - min(cellYs), max(cellYs) - centerY)
+        if maxRadius is not None:
+            maxRing = min(maxRing, int(math.ceil(maxRadius / self.cellSize)))
+            maxRadiusSquared = maxRadius * maxRadius
+
+        # A max heap of the nearest objects found so far.
+        nearest = []
+        for ring in range(max(maxRing, 0) + 1):
+            if len(nearest) >= count:
+                # Everything in this ring is at least this far away.
+                ringDistance = (ring - 1) * self.cellSize
+                if ringDistance * ringDistance > -nearest[0][0]:
+                    break
+
+            for cell in self.getRingCells(centerX, centerY, ring):
+                uids = self.cells.get(cell)
+                if not uids:
+                    continue
+                for uid in uids:
+                    if objType is not None and self.types[uid] != objType:
+                        continue
+                    distanceSquared = self.getDistanceSquared(uid, pos)
+                    if maxRadius is not None and distanceSquared > maxRadiusSquared:
+                        continue
+                    if len(nearest) < count:
+                        heapq.heappush(nearest, (-distanceSquared, uid))
+                    elif distanceSquared < -nearest[0][0]:
+                        heapq.heapreplace(nearest, (-distanceSquared, uid))
+
+        nearest.sort(reverse=True)
+        return [uid for distanceSquared, uid in nearest]
+
+    def getRingCells(self, centerX, centerY, ring):
+        if ring == 0:
+            yield (centerX, centerY)
+            return
+
+        for cellX in range(centerX - ring, centerX + ring + 1):
+            yield (cellX, centerY - ring)
+            yield (cellX, centerY + ring)
+        for cellY in range(centerY - ring + 1, centerY + ring):
+            yield (centerX - ring, cellY)
+            yield (centerX + ring, cellY)
\ No newline at end of file
@@ -0,0 +1,63 @@
+import os, sys, time, unittest
+
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from libpandaworld.PostLoadQueue import PostLoadQueue
+
+class StubClock(object):
+
+    def getRealTime(self):
+        return time.time()
+
+class PostLoadQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        if not hasattr(builtins, 'globalClock'):
+            builtins.globalClock = StubClock()
+        self.queue = PostLoadQueue()
+        self.calls = []
+
+    def makeCall(self, name, *registers):
+        def funcCall():
+            self.calls.append(name)
+            for other in registers:
+                self.queue.add(self.funcs[other])
+        return funcCall
+
+    def testReregisteredCallsAreDropped(self):
+        # 'a' registers itself and 'b', and 'b' registers 'a' again.
+        self.funcs = {'a': self.makeCall('a', 'a', 'b'), 'b': self.makeCall('b', 'a')}
+        self.queue.add(self.funcs['a'])
+
+        self.assertTrue(self.queue.dispatch())
+        self.assertEqual(self.calls, ['a', 'b'])
+        self.assertEqual(len(self.queue), 0)
+
+        self.calls = []
+        self.assertTrue(self.queue.dispatch())
+        self.assertEqual(self.calls, [])
+
+    def testCallsCanBeQueuedAfterThePass(self):
+        self.funcs = {'a': self.makeCall('a')}
+        self.queue.add(self.funcs['a'])
+        self.queue.dispatch()
+
+        self.assertTrue(self.queue.add(self.funcs['a']))
+        self.queue.dispatch()
+        self.assertEqual(self.calls, ['a', 'a'])
+
+    def testPriorityOrder(self):
+        self.funcs = {}
+        for name, priority in (('late', 2), ('early', 0), ('middle', 1), ('middle2', 1)):
+            self.queue.add(self.makeCall(name), priority)
+
+        self.queue.dispatch()
+        self.assertEqual(self.calls, ['early', 'middle', 'middle2', 'late'])
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file